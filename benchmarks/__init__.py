@@ -0,0 +1,5 @@
+import os
+import sys
+
+# asv imports the benchmarks from outside of the repository, where epm is not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,117 @@
+"""
+Load test of the forecast service on a synthetic gasoline series and an
+XGBoost model logged in a temporary MLflow store, without network access:
+
+    python -m benchmarks.forecast_service
+"""
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import mlflow
+import numpy as np
+import pandas as pd
+
+from epm.models.engine import ForecastEngine
+from epm.models.forecast_store import ForecastStore
+from epm.models.service import ForecastService, serve
+from epm.models.xgbforecaster.backend import XGBoostBackend
+from epm.price_store import PriceStore
+from epm.scraping_utils.cache import PriceCache
+
+
+def weekly_prices(n_weeks: int = 950, seed: int = 0) -> pd.DataFrame:
+    """
+    Random walk with a yearly seasonality, in €/lt like the fuel prices.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_weeks)
+    values = 1.5 + np.cumsum(rng.normal(0, 0.01, n_weeks)) + 0.05 * np.sin(2 * np.pi * t / 52)
+    return pd.DataFrame(
+        {"BENZINA": values},
+        index=pd.date_range("2005-01-02", periods=n_weeks, freq="W")
+    )
+
+
+def start_service(root: str) -> tuple:
+    """
+    Returns a running server, on a free port, of the forecasts of a model
+    trained on `weekly_prices`, and its service.
+    """
+    prices = weekly_prices()
+    mlflow.set_tracking_uri(f"file://{root}/mlruns")
+    model_uri = ForecastEngine(XGBoostBackend(n_lags=4)).train_model(
+        "service_benchmark", prices, "BENZINA", initial=f"{len(prices) * 6} days", period="182 days"
+    )
+    forecast_store = ForecastStore(PriceStore(f"{root}/forecasts"))
+    forecast_store.store.write_meta("gasoline", {"model_uri": model_uri})
+    price_cache = PriceCache(
+        store=PriceStore(f"{root}/store"),
+        sources={"fuel": (lambda: None, lambda: prices)},
+    )
+    service = ForecastService(price_cache=price_cache, forecast_store=forecast_store)
+    server = serve(port=0, service=service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, service
+
+
+def get(url: str) -> float:
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        json.loads(response.read())
+    return time.perf_counter() - start
+
+
+def run(n_requests: int = 2000, concurrency: int = 32, distinct_steps: int = 8) -> dict:
+    """
+    Sends `n_requests` requests, `concurrency` at a time, spread over
+    `distinct_steps` different horizons.
+
+    Returns the throughput, the latency percentiles and how many forecasts
+    were actually computed.
+    """
+    with tempfile.TemporaryDirectory() as root:
+        server, service = start_service(root)
+        host, port = server.server_address
+        urls = [
+            f"http://{host}:{port}/forecast/gasoline?steps={4 + i % distinct_steps}"
+            for i in range(n_requests)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = np.array(list(pool.map(get, urls)))
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+    return {
+        "requests_per_second": n_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "computations": service.computations,
+    }
+
+
+class ForecastServiceLoad:
+    timeout = 600
+
+    def setup_cache(self):
+        return run()
+
+    def track_requests_per_second(self, results):
+        return results["requests_per_second"]
+
+    def track_p99_ms(self, results):
+        return results["p99_ms"]
+
+    def track_computations(self, results):
+        return results["computations"]
+
+    track_p99_ms.unit = "milliseconds"
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:24s} {value:.4f}")
@@ -0,0 +1,97 @@
+"""
+Cold import time of the modules the pages load before any model is
+trained, each measured in a fresh interpreter, and the budget they must
+keep to:
+
+    python -m benchmarks.import_time
+
+exits with an error when the `epm` modules take more than `BUDGET` seconds
+on top of pandas, plotly and streamlit, or load any of `HEAVY_MODULES`.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+# the third-party modules every page needs anyway
+BASELINE = """
+import pandas
+import plotly.express
+import streamlit
+"""
+
+# what the commodity pages import at the top, and their price cache
+PAGES = BASELINE + """
+from epm.commodities import commodity_of
+from epm.jobs import job_key
+from epm.models.worker import ensure_workers
+from epm.pages_common import get_price_cache, prediction_figure
+from epm.plots import range_figure
+from epm.price_pyramid import PricePyramid
+from epm.scraping_utils.cache import PriceCache
+from epm.scraping_utils.pun_aggregation import GME_TZ
+from epm.tracing import trace_store
+PriceCache()
+"""
+
+# only loaded to train, load or plot a model, or to download new prices
+HEAVY_MODULES = ["mlflow", "prophet", "cmdstanpy", "xgboost", "yfinance", "openpyxl"]
+
+BUDGET = 0.3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_seconds(code: str, repeat: int = 5) -> tuple:
+    """
+    The shortest time taken by `code` in `repeat` fresh interpreters, and
+    the heavy modules it loaded.
+    """
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{code}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+    )
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    runs = []
+    # in an empty directory, where the price cache creates its own store
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", script], capture_output=True, text=True, check=True, env=env, cwd=cwd
+            ).stdout.split()
+            runs.append((float(output[0]), output[1:]))
+    return min(runs)
+
+
+def run(repeat: int = 5) -> dict:
+    baseline, _ = import_seconds(BASELINE, repeat)
+    pages, heavy = import_seconds(PAGES, repeat)
+    return {"baseline_seconds": baseline, "pages_seconds": pages, "heavy_modules": heavy}
+
+
+class ImportTime:
+    timeout = 300
+
+    def timeraw_import_baseline(self):
+        return BASELINE
+
+    def timeraw_import_pages(self):
+        return PAGES
+
+
+if __name__ == "__main__":
+    results = run()
+    overhead = results["pages_seconds"] - results["baseline_seconds"]
+    print(f"{'baseline_seconds':24s} {results['baseline_seconds']:.4f}")
+    print(f"{'pages_seconds':24s} {results['pages_seconds']:.4f}")
+    print(f"{'epm_seconds':24s} {overhead:.4f} (budget {BUDGET})")
+    errors = []
+    if overhead > BUDGET:
+        errors.append(f"the epm modules take {overhead:.3f}s to import, over the {BUDGET}s budget")
+    if results["heavy_modules"]:
+        errors.append(f"the pages load {', '.join(results['heavy_modules'])} before any model is used")
+    if errors:
+        sys.exit("\n".join(errors))
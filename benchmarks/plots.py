@@ -0,0 +1,49 @@
+"""
+Downsampling of hourly series before they are plotted, and the figure
+cache of the pages, from one year to twenty years of hourly prices:
+
+    asv run --bench plots
+"""
+from epm.downsampling import downsample
+from epm.plots import MAX_POINTS, FigureCache, data_version, forecast_figure
+
+from benchmarks.synthetic import prices
+
+
+class Downsample:
+    params = [["lttb", "minmax"], [8760, 43800, 175200]]
+    param_names = ["method", "hours"]
+
+    def setup(self, method, hours):
+        self.series = prices(hours, "h", column="PUN")["PUN"]
+
+    def time_downsample(self, method, hours):
+        downsample(self.series, MAX_POINTS, method=method)
+
+
+class HistoryFigure:
+    params = [8760, 43800, 175200]
+    param_names = ["hours"]
+
+    def setup(self, hours):
+        self.series = prices(hours, "h", column="PUN")["PUN"]
+        self.forecast = prices(hours, "h", seed=1, column="yhat").assign(yhat_lower=0.0, yhat_upper=1.0)
+
+    def build(self):
+        return forecast_figure(
+            downsample(self.series, MAX_POINTS),
+            downsample(self.forecast, MAX_POINTS, column="yhat")
+        )
+
+    def time_full_figure_json(self, hours):
+        forecast_figure(self.series, self.forecast).to_json()
+
+    def time_downsampled_figure_json(self, hours):
+        self.build().to_json()
+
+    def time_cached_figure(self, hours):
+        # a rerun of the page: the data are hashed, the figure is not rebuilt
+        cache = FigureCache()
+        key = ("history", data_version(self.series, self.forecast))
+        cache.get(key, self.build)
+        cache.get(key, self.build)
@@ -0,0 +1,41 @@
+"""
+Conversion of a price series into the lagged rows the XGBoost models are
+trained on, for weekly and hourly series of increasing length:
+
+    asv run --bench preprocessing
+"""
+from epm.models.timeseries import TimeSeries
+from epm.models.xgbforecaster.utils.preprocessing import Preprocessing
+
+from benchmarks.synthetic import prices
+
+
+class SeriesToSupervised:
+    params = [["W", "h"], [520, 5200, 13000], [1, 4, 52]]
+    param_names = ["freq", "periods", "n_in"]
+
+    def setup(self, freq, periods, n_in):
+        self.series = prices(periods, freq)["y"]
+
+    def time_series_to_supervised(self, freq, periods, n_in):
+        Preprocessing.series_to_supervised(self.series, n_in=n_in)
+
+    def time_lag_matrix(self, freq, periods, n_in):
+        Preprocessing.lag_matrix(self.series.values, n_in)
+
+    def peakmem_series_to_supervised(self, freq, periods, n_in):
+        Preprocessing.series_to_supervised(self.series, n_in=n_in)
+
+
+class PrepareSeries:
+    params = [520, 5200, 52000]
+    param_names = ["periods"]
+
+    def setup(self, periods):
+        self.df = prices(periods, "h", column="PUN")
+
+    def time_from_frame(self, periods):
+        TimeSeries.from_frame(self.df, "PUN")
+
+    def time_infer_freq(self, periods):
+        TimeSeries.from_frame(self.df, "PUN").freq
@@ -0,0 +1,86 @@
+"""
+Training, with cross-validation and MLflow tracking, and forecasting of
+the Prophet `Forecaster`, on weekly and hourly series of increasing length:
+
+    asv run --bench prophet_forecaster
+"""
+import os
+import shutil
+import tempfile
+
+import mlflow
+import pandas as pd
+
+from epm.models.prophet.forecaster import Forecaster
+
+from benchmarks.synthetic import prices
+
+PERIODS = {
+    "W": [260, 520, 1040],
+    "h": [24 * 7 * 4, 24 * 7 * 13, 24 * 7 * 26],
+}
+
+
+def cross_validation_windows(df: pd.DataFrame) -> dict:
+    """
+    `horizon`, `period` and `initial` giving 3 cutoffs, whatever the length
+    and frequency of the series.
+    """
+    span = df.index[-1] - df.index[0]
+    return {
+        "horizon": str(span * 0.1),
+        "period": str(span * 0.1),
+        "initial": str(span * 0.65),
+    }
+
+
+class TemporaryWorkdir:
+    """
+    Runs every sample in an empty directory, with its own MLflow store and
+    cross-validation cache, so that nothing is reused across samples.
+    """
+
+    def setup_workdir(self):
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp()
+        os.chdir(self.workdir)
+        mlflow.set_tracking_uri(f"file://{self.workdir}/mlruns")
+
+    def teardown_workdir(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class TrainModel(TemporaryWorkdir):
+    params = [["W", "h"], [0, 1, 2]]
+    param_names = ["freq", "size"]
+    number = 1
+    repeat = 2
+    timeout = 1800
+
+    def setup(self, freq, size):
+        self.df = prices(PERIODS[freq][size], freq)
+        self.windows = cross_validation_windows(self.df)
+        self.setup_workdir()
+
+    def teardown(self, freq, size):
+        self.teardown_workdir()
+
+    def time_train_model(self, freq, size):
+        Forecaster().train_model("benchmark", self.df, "y", **self.windows)
+
+
+class Forecast:
+    params = [["W", "h"], [0, 1, 2], [4, 52]]
+    param_names = ["freq", "size", "steps"]
+    timeout = 600
+
+    def setup(self, freq, size, steps):
+        # a fit without cross-validation nor tracking, as only forecasts are timed
+        self.forecaster = Forecaster()
+        self.forecaster.series = self.forecaster.prepare(prices(PERIODS[freq][size], freq), "y")
+        backend = self.forecaster.backend
+        self.forecaster.model = backend.fit(backend.build(backend.default_params), self.forecaster.series)
+
+    def time_forecast(self, freq, size, steps):
+        self.forecaster.forecast(n_steps=steps)
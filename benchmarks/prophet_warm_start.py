@@ -0,0 +1,90 @@
+"""
+Compares a cold Prophet refit with one warm-started from the previous
+week's model on a synthetic weekly price series:
+
+    python -m benchmarks.prophet_warm_start
+"""
+import time
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+from epm.models.prophet.warm_start import warm_start_params
+
+PARAMS = {
+    "changepoint_prior_scale": 0.5,
+    "seasonality_prior_scale": 0.1,
+    "seasonality_mode": "multiplicative",
+}
+
+
+def weekly_prices(n_weeks: int = 950, seed: int = 0) -> pd.DataFrame:
+    """
+    Random walk with a yearly seasonality, in €/lt like the fuel prices.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_weeks)
+    values = 1.5 + np.cumsum(rng.normal(0, 0.01, n_weeks)) + 0.05 * np.sin(2 * np.pi * t / 52)
+    return pd.DataFrame({
+        "ds": pd.date_range("2005-01-02", periods=n_weeks, freq="W"),
+        "y": values,
+    })
+
+
+def fit(df: pd.DataFrame, **kwargs) -> tuple:
+    start = time.perf_counter()
+    model = Prophet(**PARAMS).fit(df, **kwargs)
+    return model, time.perf_counter() - start
+
+
+def run(seeds=range(5), steps: int = 52) -> dict:
+    """
+    Fits every series without its last week, then refits it with the new
+    week both from scratch and from the previous parameters.
+
+    Returns the total fit times and the largest relative difference between
+    the cold and warm forecasts of the next `steps` weeks.
+    """
+    cold_seconds, warm_seconds, differences = 0.0, 0.0, []
+    for seed in seeds:
+        df = weekly_prices(seed=seed)
+        previous, _ = fit(df.iloc[:-1])
+
+        cold, elapsed = fit(df)
+        cold_seconds += elapsed
+        warm, elapsed = fit(df, init=warm_start_params(previous))
+        warm_seconds += elapsed
+
+        future = cold.make_future_dataframe(periods=steps, freq="W")
+        cold_yhat = cold.predict(future)["yhat"].values
+        warm_yhat = warm.predict(future)["yhat"].values
+        differences.append(np.max(np.abs(warm_yhat - cold_yhat) / np.abs(cold_yhat)))
+    return {
+        "cold_seconds": cold_seconds,
+        "warm_seconds": warm_seconds,
+        "max_relative_difference": float(np.max(differences)),
+    }
+
+
+class ProphetWarmStart:
+    timeout = 600
+
+    def setup_cache(self):
+        return run()
+
+    def track_cold_seconds(self, results):
+        return results["cold_seconds"]
+
+    def track_warm_seconds(self, results):
+        return results["warm_seconds"]
+
+    def track_max_relative_difference(self, results):
+        return results["max_relative_difference"]
+
+    track_cold_seconds.unit = "seconds"
+    track_warm_seconds.unit = "seconds"
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:24s} {value:.4f}")
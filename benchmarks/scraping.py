@@ -0,0 +1,59 @@
+"""
+Parsing and weekly aggregation of the GME yearly archives, on synthetic
+archives of increasing length:
+
+    asv run --bench scraping
+"""
+import shutil
+import tempfile
+
+from epm.price_store import PriceStore
+from epm.scraping_utils.elec_prices import ElectricityPrices
+from epm.scraping_utils.pun_aggregation import aggregate_archives
+
+from benchmarks.synthetic import pun_archive
+
+
+class ArchiveClient:
+    """
+    Serves a fixed archive in place of `HttpClient`, with no network access.
+    """
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+    def get(self, url: str, validators: dict = None):
+        return self.content, {"etag": None, "last_modified": None}
+
+
+class PunArchive:
+    params = [30, 182, 365]
+    param_names = ["days"]
+    # every sample ingests the archive into an empty store
+    number = 1
+    repeat = 5
+    timeout = 300
+
+    def setup_cache(self):
+        return {days: pun_archive(n_days=days) for days in self.params}
+
+    def setup(self, archives, days):
+        self.content = archives[days]
+        self.data_dir = tempfile.mkdtemp()
+        self.pun = ElectricityPrices(
+            data_dir=self.data_dir,
+            store=PriceStore(f"{self.data_dir}/store"),
+            client=ArchiveClient(self.content)
+        )
+
+    def teardown(self, archives, days):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def time_aggregate_archives(self, archives, days):
+        aggregate_archives([self.content])
+
+    def time_get_new_data(self, archives, days):
+        self.pun.get_new_data()
+
+    def peakmem_get_new_data(self, archives, days):
+        self.pun.get_new_data()
@@ -0,0 +1,55 @@
+"""
+Synthetic inputs shared by the benchmarks: price series of any length and
+frequency, and GME-like yearly archives of hourly PUN prices.
+"""
+import datetime
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+
+def prices(n_periods: int, freq: str = "W", seed: int = 0, column: str = "y") -> pd.DataFrame:
+    """
+    Random walk with a yearly seasonality around 1.5, indexed by date.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2005-01-02", periods=n_periods, freq=freq)
+    t = (index - index[0]) / pd.Timedelta(days=365.25)
+    values = 1.5 + np.cumsum(rng.normal(0, 0.01, n_periods)) + 0.05 * np.sin(2 * np.pi * t)
+    return pd.DataFrame({column: values}, index=index)
+
+
+def weekly_prices(n_weeks: int = 950, seed: int = 0) -> pd.Series:
+    return prices(n_weeks, "W", seed)["y"]
+
+
+def hourly_prices(n_hours: int, seed: int = 0) -> pd.Series:
+    return prices(n_hours, "h", seed)["y"]
+
+
+def pun_archive(n_days: int = 365, year: int = 2023, seed: int = 0) -> bytes:
+    """
+    A zip holding an xlsx laid out like the yearly archives of GME: the
+    hourly prices in the second sheet, with date (yyyymmdd), hour (1-24)
+    and PUN in the first three columns.
+    """
+    rng = np.random.default_rng(seed)
+    wb = Workbook(write_only=True)
+    wb.create_sheet("Vendite")
+    sheet = wb.create_sheet("Prezzi-Prices")
+    sheet.append(["Data/Date", "Ora/Hour", "PUN"])
+    first = datetime.date(year, 1, 1)
+    for day in range(n_days):
+        date = int((first + datetime.timedelta(days=day)).strftime("%Y%m%d"))
+        for hour, pun in enumerate(100 + rng.normal(0, 20, 24), start=1):
+            sheet.append([date, hour, float(pun)])
+    xlsx = BytesIO()
+    wb.save(xlsx)
+
+    archive = BytesIO()
+    with ZipFile(archive, "w", ZIP_DEFLATED) as zf:
+        zf.writestr(f"Anno{year}.xlsx", xlsx.getvalue())
+    return archive.getvalue()
@@ -0,0 +1,59 @@
+"""
+Hyperparameter search and rolling forecasts of `XGBForecaster`, on weekly
+and hourly series of increasing length:
+
+    asv run --bench xgb_forecaster
+"""
+import numpy as np
+from xgboost import XGBRegressor
+
+from epm.models.xgbforecaster.utils.preprocessing import Preprocessing
+from epm.models.xgbforecaster.xgbforecaster import XGBForecaster
+
+from benchmarks.synthetic import prices
+
+PARAMETERS = {
+    "gamma": [0, 30],
+    "eta": [0.3, 0.03],
+    "max_depth": [6, 12],
+}
+
+
+def supervised(periods: int, freq: str, n_in: int = 4):
+    series = prices(periods, freq)["y"]
+    return Preprocessing.series_to_supervised(series, n_in=n_in)
+
+
+class GridSearch:
+    params = [["W", "h"], [520, 5200]]
+    param_names = ["freq", "periods"]
+    number = 1
+    repeat = 3
+    timeout = 900
+
+    def setup(self, freq, periods):
+        self.train_df = supervised(periods, freq)
+
+    def time_grid_search(self, freq, periods):
+        XGBForecaster().grid_search(PARAMETERS, n_folds=5, train_df=self.train_df, test_size=52)
+
+
+class Forecast:
+    params = [[1, 52, 520], [1, 100]]
+    param_names = ["steps", "series"]
+
+    def setup_cache(self):
+        train_df = supervised(5200, "h")
+        model = XGBForecaster().fit(XGBRegressor(n_estimators=100), train_df)
+        return model, train_df
+
+    def setup(self, cache, steps, series):
+        self.model, train_df = cache
+        rows = train_df.values[-series:]
+        self.rows = rows if series > 1 else rows[0]
+
+    def time_forecast(self, cache, steps, series):
+        if series == 1:
+            XGBForecaster().forecast(self.model, self.rows, steps)
+        else:
+            XGBForecaster().forecast_batch(self.model, np.asarray(self.rows), steps)
@@ -0,0 +1,87 @@
+"""
+Compares the previous `GridSearchCV` search of `XGBForecaster.grid_search`
+with `TimeSeriesSearch` on a synthetic weekly price series:
+
+    python -m benchmarks.xgb_search
+"""
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_percentage_error
+from sklearn.model_selection import GridSearchCV
+from xgboost import XGBRegressor
+
+from epm.models.xgbforecaster.search import TimeSeriesSearch
+from epm.models.xgbforecaster.utils.preprocessing import Preprocessing
+from epm.models.xgbforecaster.xgbforecaster import XGBForecaster
+
+PARAMETERS = {
+    "gamma": [0, 30, 100, 200],
+    "eta": [0.3, 0.03, 0.003],
+    "max_depth": [6, 12, 30],
+}
+
+
+def weekly_prices(n_weeks: int = 950, seed: int = 0) -> pd.Series:
+    """
+    Random walk with a yearly seasonality, in €/lt like the fuel prices.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_weeks)
+    values = 1.5 + np.cumsum(rng.normal(0, 0.01, n_weeks)) + 0.05 * np.sin(2 * np.pi * t / 52)
+    return pd.Series(values, index=pd.date_range("2005-01-02", periods=n_weeks, freq="W"))
+
+
+def split(n_in: int = 4, frac: float = 0.05, seed: int = 0):
+    series = weekly_prices(seed=seed)
+    train, test = Preprocessing.train_test_split_series(series, round(len(series) * frac))
+    train_df = Preprocessing.series_to_supervised(train, n_in=n_in)
+    return train_df, test
+
+
+def run(make_search, seeds=range(5)) -> tuple:
+    """
+    Returns the total search time and the mean MAPE of the forecasts
+    over the test weeks of a few synthetic series.
+    """
+    elapsed, mapes = 0.0, []
+    for seed in seeds:
+        train_df, test = split(seed=seed)
+        forecaster = XGBForecaster()
+        start = time.perf_counter()
+        model = forecaster.fit(make_search(), train_df)
+        elapsed += time.perf_counter() - start
+        predictions = forecaster.forecast(model, train_df.iloc[-1, :], len(test))
+        mapes.append(mean_absolute_percentage_error(test, predictions))
+    return elapsed, float(np.mean(mapes))
+
+
+class XGBSearch:
+    timeout = 1800
+
+    def setup_cache(self):
+        return {
+            "grid": run(lambda: GridSearchCV(XGBRegressor(), PARAMETERS, cv=10, n_jobs=-1)),
+            "time_series": run(lambda: TimeSeriesSearch(PARAMETERS, n_splits=10, n_jobs=-1)),
+        }
+
+    def track_grid_seconds(self, results):
+        return results["grid"][0]
+
+    def track_time_series_seconds(self, results):
+        return results["time_series"][0]
+
+    def track_grid_mape(self, results):
+        return results["grid"][1]
+
+    def track_time_series_mape(self, results):
+        return results["time_series"][1]
+
+    track_grid_seconds.unit = "seconds"
+    track_time_series_seconds.unit = "seconds"
+
+
+if __name__ == "__main__":
+    results = XGBSearch().setup_cache()
+    for name, (elapsed, mape) in results.items():
+        print(f"{name:12s} {elapsed:8.2f}s  MAPE {mape:.4f}")
@@ -0,0 +1,45 @@
+# the commodities forecast by the app: the price source they are read from
+# (see `epm.scraping_utils.cache.PriceCache`), their column in it and the
+# names of their MLflow experiment and model artifact
+COMMODITIES = {
+    "gasoline": {
+        "source": "fuel",
+        "column": "BENZINA",
+        "experiment_name": "gasoline_model",
+        "artifact_path": "gasoline_prices_model",
+    },
+    "diesel": {
+        "source": "fuel",
+        "column": "DIESEL",
+        "experiment_name": "diesel_model",
+        "artifact_path": "diesel_prices_model",
+    },
+    "gpl": {
+        "source": "fuel",
+        "column": "GPL",
+        "experiment_name": "nlg_model",
+        "artifact_path": "nlg_prices_model",
+    },
+    "pun": {
+        "source": "pun",
+        "column": "PUN",
+        "experiment_name": "electricity_model",
+        "artifact_path": "electricity_prices_model",
+    },
+    "gas": {
+        "source": "gas",
+        "column": "GAS NATURALE",
+        "experiment_name": "gas_model",
+        "artifact_path": "gas_prices_model",
+    },
+}
+
+
+def commodity_of(source: str, column: str) -> str:
+    """
+    Returns the name of the commodity stored in `column` of a price source.
+    """
+    for name, commodity in COMMODITIES.items():
+        if commodity["source"] == source and commodity["column"] == column:
+            return name
+    raise KeyError(f"No commodity for column {column} of {source}")
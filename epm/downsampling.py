@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks `n_out` points that keep the
+    visual shape of a line, always including the first and the last one.
+
+    The points between the first and the last are split into `n_out - 2`
+    buckets; from each bucket the point forming the largest triangle with
+    the point picked from the previous bucket and the mean of the next
+    bucket is kept.
+
+    Args
+    ---------
+    `x`, `y`: `np.ndarray`
+        the coordinates of the points, sorted by `x`, without missing values.
+    `n_out`: `int`
+        the number of points to keep.
+
+    Returns
+    --------
+    `indices`: `np.ndarray`
+        the sorted positions of the points kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    indices = np.empty(n_out, dtype="int64")
+    indices[0], indices[-1] = 0, n - 1
+    picked = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # the next bucket of the last one is the last point
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x, mean_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        areas = np.abs(
+            (x[picked] - mean_x) * (y[lo:hi] - y[picked])
+            - (x[picked] - x[lo:hi]) * (mean_y - y[picked])
+        )
+        picked = lo + int(areas.argmax())
+        indices[i + 1] = picked
+    return indices
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max envelope: splits the points into `n_out // 2` buckets and keeps
+    the lowest and the highest of each, so that no spike is lost.
+
+    Returns
+    --------
+    `indices`: `np.ndarray`
+        the sorted positions of the points kept.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+
+    edges = np.linspace(0, n, n_out // 2 + 1).astype("int64")
+    indices = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        indices += [lo + int(y[lo:hi].argmin()), lo + int(y[lo:hi].argmax())]
+    return np.unique(indices)
+
+
+def downsample(
+        data,
+        n_out: int = 2000,
+        column: str = None,
+        method: str = "lttb",
+        start=None,
+        end=None
+    ):
+    """
+    Restricts a series to a time window and keeps at most `n_out` of its
+    points, chosen on one column: every column of the rows kept is returned,
+    so that e.g. a forecast keeps its interval around the points picked on
+    `yhat`.
+
+    Args
+    ---------
+    `data`: `pd.Series` or `pd.DataFrame`
+        indexed by date, sorted.
+    `n_out`: `int`
+        the maximum number of points returned.
+    `column`: `str`
+        the column of a DataFrame the points are chosen on.
+    `method`: `str`
+        `lttb`, which follows the shape of the line, or `minmax`, which
+        keeps the extremes of every bucket.
+    `start`, `end`: date-like
+        the window to plot, `end` excluded.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if start is not None:
+        data = data[data.index >= pd.Timestamp(start)]
+    if end is not None:
+        data = data[data.index < pd.Timestamp(end)]
+
+    values = data if isinstance(data, pd.Series) else data[column]
+    data = data[values.notna().to_numpy()]
+    if len(data) <= n_out:
+        return data
+    values = values.dropna().to_numpy()
+
+    if method == "lttb":
+        # seconds from the first date, so that the areas stay well within float precision
+        x = (data.index - data.index[0]).total_seconds().to_numpy()
+        indices = lttb(x, values, n_out)
+    else:
+        indices = minmax(values, n_out)
+    return data.iloc[indices]
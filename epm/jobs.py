@@ -0,0 +1,234 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import pandas as pd
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result TEXT,
+    error TEXT,
+    worker INTEGER,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    key TEXT,
+    used_at TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key);
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    heartbeat TEXT NOT NULL
+);
+"""
+
+
+def job_key(kind: str, params: dict, data: pd.DataFrame = None) -> str:
+    """
+    Hash of everything a training job depends on: its kind, all its
+    parameters and the data it is trained on.
+    """
+    digest = hashlib.sha256(json.dumps([kind, params], sort_keys=True, default=str).encode())
+    if data is not None:
+        digest.update(pd.util.hash_pandas_object(data).values.tobytes())
+    return digest.hexdigest()
+
+
+class JobQueue:
+    """
+    Local job queue backed by a SQLite file, shared by the Streamlit
+    processes that submit jobs and the worker processes that run them
+    (see `epm.models.worker`).
+
+    Jobs go from `queued` to `running` when a worker claims them, then to
+    `done`, with a JSON result, or `failed`, with the error message. A job
+    whose worker died is queued again, and failed once it has been claimed
+    `max_attempts` times, so that a job killing its worker (e.g. out of
+    memory) does not take down every worker in turn.
+
+    Jobs submitted with a `key` (see `job_key`) also make a training cache
+    shared by every session: a job with the same key as a queued, running or
+    done one is not queued again, and only the `max_entries` most recently
+    used finished jobs are kept.
+    """
+
+    def __init__(self, path: str = "data/jobs.sqlite", max_entries: int = 64, max_attempts: int = 3) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            # queues created before jobs had keys
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if columns and "key" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN key TEXT")
+                conn.execute("ALTER TABLE jobs ADD COLUMN used_at TEXT")
+            # queues created before jobs counted their attempts
+            if columns and "attempts" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.executescript(SCHEMA)
+
+    def submit(self, kind: str, params: dict, key: str = None) -> int:
+        """
+        Queues a job and returns its id, or returns the id of the queued,
+        running or done job with the same `key`.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = None
+            if key is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND status != 'failed' ORDER BY id DESC LIMIT 1",
+                    (key,)
+                ).fetchone()
+            if row is not None:
+                job_id = row["id"]
+                conn.execute("UPDATE jobs SET used_at = ? WHERE id = ?", (self._now(), job_id))
+            else:
+                job_id = conn.execute(
+                    "INSERT INTO jobs (kind, params, key, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                    (kind, json.dumps(params, sort_keys=True), key, self._now(), self._now())
+                ).lastrowid
+                self._evict(conn)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self, worker: int):
+        """
+        Marks the oldest queued job as running for `worker`.
+
+        Returns
+        --------
+        `job`: `dict` or `None`
+            the claimed job, `None` when the queue is empty.
+        """
+        conn = self._connect()
+        try:
+            # the write lock is taken before reading, so two workers never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (worker, self._now(), row["id"])
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return self._job(row) if row is not None else None
+
+    def finish(self, job_id: int, result: dict) -> None:
+        self._close(job_id, "done", result=json.dumps(result))
+
+    def fail(self, job_id: int, error: str) -> None:
+        self._close(job_id, "failed", error=error)
+
+    def status(self, job_id: int) -> dict:
+        """
+        Returns a job with its status, result and error.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No job {job_id}")
+        return self._job(row)
+
+    def position(self, job_id: int) -> int:
+        """
+        Number of queued jobs that will be claimed before this one.
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)
+            ).fetchone()[0]
+
+    def heartbeat(self, pid: int) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (pid, heartbeat) VALUES (?, ?)",
+                (pid, self._now())
+            )
+
+    def live_workers(self, timeout: float = 30) -> list:
+        """
+        Returns the pids of the workers that sent a heartbeat in the last `timeout` seconds.
+        """
+        since = (datetime.datetime.now() - datetime.timedelta(seconds=timeout)).isoformat()
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT pid FROM workers WHERE heartbeat >= ?", (since,)).fetchall()
+        return [row["pid"] for row in rows]
+
+    def requeue_orphans(self, timeout: float = 30) -> int:
+        """
+        Queues again the running jobs of workers that stopped sending
+        heartbeats, or fails them after `max_attempts` claims.
+
+        Returns
+        --------
+        `n_jobs`: `int`
+            the number of jobs queued again.
+        """
+        live = self.live_workers(timeout)
+        orphans = f"status = 'running' AND worker NOT IN ({','.join('?' * len(live))})"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"UPDATE jobs SET status = 'failed', finished_at = ?, error = "
+                f"'The worker died ' || attempts || ' times while running this job' "
+                f"WHERE {orphans} AND attempts >= ?",
+                [self._now(), *live, self.max_attempts]
+            )
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE {orphans}",
+                live
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return cursor.rowcount
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # the least recently used finished jobs; their models stay logged in MLflow
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND id NOT IN ("
+            "SELECT id FROM jobs WHERE status IN ('done', 'failed') "
+            "ORDER BY used_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def _close(self, job_id: int, status: str, result: str = None, error: str = None) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, self._now(), job_id)
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _job(self, row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _now(self) -> str:
+        return datetime.datetime.now().isoformat()
@@ -0,0 +1,176 @@
+import argparse
+import datetime
+import glob
+import hashlib
+import os
+import time
+import pandas as pd
+
+from epm.commodities import COMMODITIES
+from epm.models.forecast_store import ForecastStore
+from epm.models.prophet.forecaster import Forecaster
+from epm.price_store import PriceStore
+from epm.scraping_utils.cache import PriceCache
+
+# the exact prices of the queued training jobs, see `snapshot_training_data`
+SNAPSHOTS = "data/snapshots"
+
+
+def training_data(commodity: str, price_cache: PriceCache) -> pd.DataFrame:
+    """
+    Returns the observed prices of a commodity, in a single column named
+    after it in its price source.
+    """
+    settings = COMMODITIES[commodity]
+    return price_cache.get(settings["source"])[[settings["column"]]].dropna()
+
+
+def snapshot_training_data(
+        commodity: str,
+        prices: pd.DataFrame,
+        root: str = SNAPSHOTS,
+        max_entries: int = 128
+    ) -> str:
+    """
+    Saves the prices a training job is submitted with, so that the worker
+    trains on exactly the data the job key was computed from, even when
+    the source is refreshed in the meantime.
+
+    Args
+    ---------
+    `commodity`: `str`
+        a key of `COMMODITIES`.
+    `prices`: `pd.DataFrame`
+        the prices of its source, as read by the page.
+    `max_entries`: `int`
+        the number of snapshots kept, the least recently saved are removed.
+
+    Returns
+    --------
+    `data_version`: `str`
+        the name of the snapshot, a hash of its prices, see `read_snapshot`.
+    """
+    data = prices[[COMMODITIES[commodity]["column"]]].dropna()
+    digest = hashlib.sha256(",".join(data.columns).encode())
+    digest.update(pd.util.hash_pandas_object(data).values.tobytes())
+    data_version = digest.hexdigest()
+
+    store = PriceStore(root)
+    if store.exists(data_version):
+        os.utime(store.path(data_version))
+    else:
+        store.write(data_version, data, overwrite=True)
+
+    paths = sorted(glob.glob(os.path.join(root, "*.arrow")), key=os.path.getmtime)
+    for path in paths[:max(len(paths) - max_entries, 0)]:
+        os.remove(path)
+    return data_version
+
+
+def read_snapshot(data_version: str, root: str = SNAPSHOTS) -> pd.DataFrame:
+    """
+    Returns the prices saved by `snapshot_training_data`.
+    """
+    store = PriceStore(root)
+    if not store.exists(data_version):
+        raise FileNotFoundError(f"No training data snapshot {data_version} in {root}")
+    return store.read(data_version)
+
+
+def train_commodity(
+        commodity: str,
+        price_cache: PriceCache,
+        forecast_store: ForecastStore,
+        n_steps: int = 52,
+        horizon: int = 4,
+        period: int = 2
+    ) -> str:
+    """
+    Trains the model of a commodity with the default settings of the pages
+    and stores its forecast of the next `n_steps` weeks.
+
+    Args
+    ---------
+    `commodity`: `str`
+        a key of `COMMODITIES`.
+    `n_steps`: `int`
+        number of weeks to forecast.
+    `horizon`, `period`: `int`
+        horizon and period of the cross-validation, in weeks.
+
+    Returns
+    --------
+    `model_uri`: `str`
+        the uri of the logged model.
+    """
+    settings = COMMODITIES[commodity]
+    prices = training_data(commodity, price_cache)
+
+    forecaster = Forecaster()
+    model_uri = forecaster.train_model(
+        experiment_name=settings["experiment_name"],
+        train_df=prices,
+        target_col=settings["column"],
+        artifact_path=settings["artifact_path"],
+        horizon=f"{horizon * 7} days",
+        period=f"{period * 7} days",
+        initial=f"{round(len(prices) * 0.75)} days"
+    )
+    predictions = forecaster.forecast(n_steps=n_steps, keep_in_sample_forecast=True)
+    forecast_store.write(commodity, predictions, {
+        "model_uri": model_uri,
+        "trained_at": datetime.datetime.now().isoformat(),
+        "last_observation": prices.index.max().isoformat(),
+        "n_steps": n_steps,
+    })
+    return model_uri
+
+
+def train_all(
+        commodities: list = None,
+        price_cache: PriceCache = None,
+        forecast_store: ForecastStore = None,
+        n_steps: int = 52
+    ) -> dict:
+    """
+    Trains every commodity model and stores its forecast; a failing
+    commodity does not stop the others.
+
+    Returns
+    --------
+    `results`: `dict`
+        for each commodity, the model uri or the exception it raised.
+    """
+    price_cache = price_cache if price_cache is not None else PriceCache()
+    forecast_store = forecast_store if forecast_store is not None else ForecastStore()
+    results = {}
+    for commodity in commodities or COMMODITIES:
+        try:
+            results[commodity] = train_commodity(
+                commodity, price_cache, forecast_store, n_steps=n_steps
+            )
+        except Exception as e:
+            print(f"Failed to train {commodity}: {e}")
+            results[commodity] = e
+    return results
+
+
+if __name__ == "__main__":
+    # meant to be scheduled, e.g. weekly with cron:
+    # 0 6 * * 1  cd /path/to/epm && python -m epm.models.batch
+    parser = argparse.ArgumentParser(
+        description="Trains the commodity models and precomputes their forecasts."
+    )
+    parser.add_argument(
+        "commodities", nargs="*", help=f"any of {', '.join(COMMODITIES)}, all by default"
+    )
+    parser.add_argument("--steps", type=int, default=52, help="weeks to forecast")
+    args = parser.parse_args()
+    unknown = set(args.commodities) - set(COMMODITIES)
+    if unknown:
+        parser.error(f"unknown commodities: {', '.join(sorted(unknown))}")
+
+    start = time.perf_counter()
+    for commodity, result in train_all(args.commodities, n_steps=args.steps).items():
+        print(f"{commodity}: {result}")
+    print(f"Trained in {time.perf_counter() - start:.2f}s")
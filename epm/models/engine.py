@@ -0,0 +1,324 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from epm.models.model_cache import MODEL_CACHE
+from epm.models.timeseries import TimeSeries
+from epm.tracing import span
+
+
+def anchored_cutoffs(df: pd.DataFrame, horizon: pd.Timedelta, initial: pd.Timedelta, period: pd.Timedelta) -> list:
+    """
+    Cutoffs every `period` starting `initial` after the first date, up to
+    `horizon` before the last one.
+
+    Prophet generates its cutoffs backwards from the end of the series, so
+    they all move when a new week is added or the horizon changes; anchoring
+    them at the start keeps the existing ones, and their fitted models, valid.
+    """
+    cutoffs = []
+    cutoff = df["ds"].min() + initial
+    last = df["ds"].max() - horizon
+    while cutoff <= last:
+        # skip cutoffs without any data to predict, as prophet does
+        if ((df["ds"] > cutoff) & (df["ds"] <= cutoff + horizon)).any():
+            cutoffs.append(cutoff)
+        cutoff += period
+    if len(cutoffs) == 0:
+        raise ValueError("Less data than horizon after initial window. Make horizon or initial shorter.")
+    return cutoffs
+
+
+class ModelBackend:
+    """
+    The model-specific half of a forecaster: how to build, fit, validate,
+    log and predict one kind of model on a `TimeSeries`.
+
+    Everything else (data preparation, MLflow runs, metrics and the forecast
+    API) is done once by `ForecastEngine`, for every backend.
+    """
+
+    # default MLflow artifact path and model parameters of the backend
+    artifact_path = "model"
+    default_params = {}
+
+    def build(self, params: dict):
+        """
+        Returns an unfitted model configured with `params`.
+        """
+        raise NotImplementedError
+
+    def fit(self, model, series: TimeSeries, **fit_kwargs):
+        """
+        Fits `model` on a series, returns the fitted model.
+        """
+        raise NotImplementedError
+
+    def predict(self, model, series: TimeSeries, n_steps: int, include_history: bool = True) -> pd.DataFrame:
+        """
+        Predicts the `n_steps` periods following `series`, and the series itself
+        when `include_history` is set.
+
+        Returns
+        --------
+        `predictions`: `pd.DataFrame`
+            with at least the columns `ds` and `yhat`.
+        """
+        raise NotImplementedError
+
+    def cross_validate(self, model, series: TimeSeries, horizon: str, period: str, initial: str) -> pd.DataFrame:
+        """
+        Refits the model at every cutoff of `anchored_cutoffs` and predicts the
+        following `horizon`.
+
+        Returns
+        --------
+        `df_cv`: `pd.DataFrame`
+            with columns `ds`, `yhat`, `y` and `cutoff`, plus `yhat_lower` and
+            `yhat_upper` when the backend has uncertainty intervals.
+        """
+        horizon, period, initial = pd.Timedelta(horizon), pd.Timedelta(period), pd.Timedelta(initial)
+        predictions = []
+        for cutoff in anchored_cutoffs(series.frame, horizon, initial, period):
+            history = series.until(cutoff)
+            actual = series.between(cutoff, cutoff + horizon)
+            fitted = self.fit(self.clone(model), history)
+            yhat = self.predict(fitted, history, len(actual), include_history=False)
+            yhat = yhat.reset_index(drop=True).assign(
+                y=actual.y, cutoff=cutoff, ds=actual.ds
+            )
+            predictions.append(yhat)
+        return pd.concat(predictions, axis=0).reset_index(drop=True)
+
+    def evaluate(self, df_cv: pd.DataFrame, metrics: list) -> dict:
+        """
+        Averages the requested error metrics over the cross-validation predictions.
+        """
+        error = df_cv["y"] - df_cv["yhat"]
+        values = {
+            "mse": lambda: np.mean(error ** 2),
+            "rmse": lambda: np.sqrt(np.mean(error ** 2)),
+            "mae": lambda: np.mean(np.abs(error)),
+            "mape": lambda: np.mean(np.abs(error / df_cv["y"])),
+            "mdape": lambda: np.median(np.abs(error / df_cv["y"])),
+            "smape": lambda: np.mean(2 * np.abs(error) / (np.abs(df_cv["y"]) + np.abs(df_cv["yhat"]))),
+            "coverage": lambda: np.mean(
+                (df_cv["y"] >= df_cv["yhat_lower"]) & (df_cv["y"] <= df_cv["yhat_upper"])
+            ),
+        }
+        return {
+            k: float(values[k]())
+            for k in metrics
+            if k != "coverage" or "yhat_lower" in df_cv.columns
+        }
+
+    def clone(self, model):
+        """
+        Returns an unfitted copy of `model` with the same configuration.
+        """
+        raise NotImplementedError
+
+    def params(self, model) -> dict:
+        """
+        The parameters of a fitted model to log in the MLflow run.
+        """
+        raise NotImplementedError
+
+    def warm_start(self, model_uri: str) -> dict:
+        """
+        The `fit_kwargs` that start a fit from the model logged at `model_uri`.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support warm starts")
+
+    def log_model(self, model, artifact_path: str, series: TimeSeries, predictions: pd.DataFrame):
+        """
+        Logs the model in the active MLflow run and returns its `ModelInfo`.
+        """
+        raise NotImplementedError
+
+    def load_model(self, model_uri: str):
+        raise NotImplementedError
+
+
+class ForecastEngine:
+    """
+    Trains, validates, tracks and predicts a time-series model, whatever
+    its `ModelBackend`:
+
+        forecaster = ForecastEngine(ProphetBackend())
+        model_uri = forecaster.train_model("fuel", fuel_prices, "BENZINA")
+        predictions = forecaster.forecast(n_steps=4)
+    """
+
+    def __init__(self, backend: ModelBackend) -> None:
+        self.backend = backend
+
+    def extract_params(self, model) -> dict:
+        return self.backend.params(model)
+
+    @property
+    def train_df(self) -> pd.DataFrame:
+        """
+        The training series as a read-only DataFrame with columns `ds` and `y`.
+        """
+        return self.series.frame
+
+    def prepare(self, train_df: pd.DataFrame, target_col: str, date_col: str = "index") -> TimeSeries:
+        """
+        Returns the target series of `train_df`, the input of every backend.
+        `train_df` itself is neither copied nor modified.
+        """
+        return TimeSeries.from_frame(train_df, target_col, date_col)
+
+    def train_model(
+            self,
+            experiment_name: str,
+            train_df: pd.DataFrame,
+            target_col: str,
+            date_col: str = "index",
+            horizon: str = "28 days",
+            period: str = "14 days",
+            initial: str = "1680 days",
+            artifact_path: str = None,
+            metrics: list = ["mse", "rmse", "mae", "mape", "mdape", "smape", "coverage"],
+            time_series_params: dict = None,
+            init_model_uri: str = None
+        ) -> str:
+        """
+        Trains the backend model on a given DataFrame, cross-validates it and
+        tracks the experiment with MLflow.
+
+        Args
+        ---------
+        `train_df`: `pd.DataFrame`
+            the training data for the model.
+        `target_col`: `str`
+            the time-series target column
+        `date_col`: `str`
+            the column holding the time informations on the series
+        `horizon`: `str`
+            it's the horizon interval of each prediction performed during training
+        `period`: `str`
+            it's the frequency of predictions performed during training
+        `initial`: `str`
+            the initial training set
+        `artifact_path`: `str`
+            the path pointing to the MLflow artifact, the backend default when `None`.
+        `metrics`: `list`:
+            list of the metrics to track in the mlflow experiment run.
+        `time_series_params`: `dict`
+            parameters of the model, merged with the backend defaults.
+        `init_model_uri`: `str`
+            uri of a previously logged model of the same series to warm-start the fit
+            from, when the backend supports it (see `ModelBackend.warm_start`).
+
+        Returns
+        --------
+        `model_uri`: `str`
+            the model uri to load the model directly from MLflow
+        """
+        self.target_col = target_col
+        self.date_col = date_col
+        self.series = self.prepare(train_df, target_col, date_col)
+        artifact_path = artifact_path or self.backend.artifact_path
+        params = {**self.backend.default_params, **(time_series_params or {})}
+
+        # imported here, so that the pages only load mlflow to train a model
+        import mlflow
+
+        fit_kwargs = {}
+        if init_model_uri:
+            fit_kwargs = self.backend.warm_start(init_model_uri)
+
+        backend = type(self.backend).__name__
+        mlflow.set_experiment(experiment_name=experiment_name)
+        with mlflow.start_run(), span("model.train", backend=backend, rows=len(self.series)):
+            with span("model.fit", backend=backend):
+                model = self.backend.fit(self.backend.build(params), self.series, **fit_kwargs)
+            params = self.backend.params(model)
+
+            with span("model.cross_validate", backend=backend):
+                metrics_raw = self.backend.cross_validate(
+                    model=model,
+                    series=self.series,
+                    horizon=horizon,
+                    period=period,
+                    initial=initial,
+                )
+            metrics_dict = self.backend.evaluate(metrics_raw, metrics)
+
+            print(f"Logged Metrics: \n{json.dumps(metrics_dict, indent=2)}")
+            print(f"Logged Params: \n{json.dumps(params, indent=2, default=str)}")
+
+            predictions = self.backend.predict(model, self.series, n_steps=10)
+            with span("mlflow.log_model", backend=backend):
+                model_info = self.backend.log_model(model, artifact_path, self.series, predictions)
+            mlflow.log_params(params)
+            mlflow.log_param("warm_start", len(fit_kwargs) > 0)
+            mlflow.log_metrics(metrics_dict)
+            self.model_uri = model_info.model_uri
+
+        self.model = model # to use outside of mlflow
+
+        return self.model_uri
+
+    def load(
+            self,
+            model_uri: str,
+            train_df: pd.DataFrame,
+            target_col: str,
+            date_col: str = "index"
+        ) -> "ForecastEngine":
+        """
+        Uses a model trained elsewhere, e.g. by a worker process, as if it had
+        been trained by this forecaster on `train_df`.
+        """
+        self.target_col = target_col
+        self.date_col = date_col
+        self.series = self.prepare(train_df, target_col, date_col)
+        self.model = MODEL_CACHE.load(model_uri, self.backend.load_model)
+        self.model_uri = model_uri
+        return self
+
+    def forecast(
+            self,
+            n_steps: int = 0,
+            keep_in_sample_forecast: bool = True,
+            model_uri: str = None
+        ) -> pd.DataFrame:
+        """
+        Use the trained model to predict into the future. \n
+        The user can predict only on the training data horizon (in-sample forecast)
+        and also forecast into the future, specifying how many steps ahead with
+        the param `n_steps` (out-of-sample forecast).
+
+        Args:
+        ----------
+        n_steps: int
+            the number of steps (1 step is one skip in the frequency of the training set)
+            into the future you want to obtain a forecast for. \n
+            When set to 0, we are only predicting in-sample.
+        keep_in_sample_forecast: bool
+            wether or not to keep the predictions made on the test set
+        model_uri: str
+            a model logged into mlflow, instead of the one trained by this forecaster.
+            Loaded models are kept in `MODEL_CACHE`.
+        """
+        if not model_uri: # use the model nested in the forecaster class
+            model = self.model
+        else: # use the model logged into mlflow, deserialised once per version
+            model = MODEL_CACHE.load(model_uri, self.backend.load_model)
+
+        with span("model.predict", backend=type(self.backend).__name__, n_steps=n_steps):
+            predictions = self.backend.predict(
+                model,
+                self.series,
+                n_steps=n_steps,
+                include_history=True
+            )
+
+        if not keep_in_sample_forecast:
+            predictions = predictions.tail(n_steps)
+
+        return predictions
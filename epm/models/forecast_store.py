@@ -0,0 +1,47 @@
+import pandas as pd
+
+from epm.price_store import PriceStore
+
+FORECAST_COLUMNS = ["yhat", "yhat_lower", "yhat_upper"]
+
+
+class ForecastStore:
+    """
+    Forecasts precomputed by the batch job (`epm.models.batch`), so that the
+    pages can show them without training a model.
+
+    Every commodity keeps only its latest forecast, in-sample predictions
+    included, as a dataset of a `PriceStore`, with the details of the
+    training in its metadata.
+    """
+
+    def __init__(self, store: PriceStore = None) -> None:
+        self.store = store if store is not None else PriceStore("data/forecasts")
+
+    def write(self, commodity: str, predictions: pd.DataFrame, meta: dict) -> None:
+        """
+        Replaces the forecast of a commodity.
+
+        Args
+        ---------
+        `predictions`: `pd.DataFrame`
+            the output of `ForecastEngine.forecast`, with columns `ds`, `yhat`,
+            `yhat_lower` and `yhat_upper`.
+        `meta`: `dict`
+            e.g. the model uri and the last observed date.
+        """
+        df = predictions.set_index("ds")[FORECAST_COLUMNS]
+        self.store.write(commodity, df, overwrite=True)
+        self.store.write_meta(commodity, meta)
+
+    def read(self, commodity: str) -> pd.DataFrame:
+        """
+        Returns the forecast of a commodity indexed by date, or `None`
+        when it has never been computed.
+        """
+        if not self.store.exists(commodity):
+            return None
+        return self.store.read(commodity)
+
+    def read_meta(self, commodity: str) -> dict:
+        return self.store.read_meta(commodity)
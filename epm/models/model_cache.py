@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+from epm.tracing import span
+
+
+class ModelCache:
+    """
+    In-process LRU cache of the models loaded from MLflow, so that repeated
+    forecasts with the same `model_uri` deserialise the model only once.
+
+    Entries are keyed by the URI and by the registry version it resolves to:
+    `models:/<name>/latest`, `models:/<name>/<stage>` and `models:/<name>@<alias>`
+    are resolved on every lookup (a metadata call, much cheaper than loading
+    the model), so registering a new version is picked up even by a cache
+    living in another process. Run, artifact and logged model URIs
+    (`models:/<model_id>`) are immutable and never resolved.
+    """
+
+    def __init__(self, max_entries: int = 8, client=None) -> None:
+        """
+        Args
+        ---------
+        `max_entries`: `int`
+            number of models kept in memory, the least recently used is evicted first.
+        `client`: `MlflowClient`
+            the client used to resolve registry versions.
+        """
+        self.max_entries = max_entries
+        self._client = client
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            # imported here, so that importing the cache does not load mlflow
+            from mlflow.tracking import MlflowClient
+            self._client = MlflowClient()
+        return self._client
+
+    def load(self, model_uri: str, loader):
+        """
+        Returns the model at `model_uri`, calling `loader(model_uri)` only
+        when it is not cached yet.
+        """
+        key = (model_uri, self.resolve_version(model_uri))
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            self.misses += 1
+
+        with span("model.load", model_uri=model_uri):
+            model = loader(model_uri)
+        with self._lock:
+            # drop the versions this uri pointed to before
+            for stale in [k for k in self._models if k[0] == model_uri]:
+                del self._models[stale]
+            self._models[key] = model
+            while len(self._models) > self.max_entries:
+                self._models.popitem(last=False)
+        return model
+
+    def resolve_version(self, model_uri: str):
+        """
+        Returns the registry version a `models:/` uri points to, `None` for
+        any other uri.
+        """
+        if not model_uri.startswith("models:/"):
+            return None
+        path = model_uri[len("models:/"):].strip("/")
+        if "@" in path:
+            name, alias = path.split("@", 1)
+            return self.client.get_model_version_by_alias(name, alias).version
+        name, _, version = path.partition("/")
+        if version == "" or version.isdigit():
+            # a logged model id or a version number, both immutable
+            return version or None
+        if version.lower() == "latest":
+            versions = self.client.search_model_versions(f"name='{name}'")
+        else:
+            versions = self.client.get_latest_versions(name, stages=[version])
+        return max((v.version for v in versions), key=int, default=None)
+
+    def invalidate(self, model_name: str = None) -> None:
+        """
+        Drops the cached versions of a registered model, or every entry.
+        """
+        with self._lock:
+            if model_name is None:
+                self._models.clear()
+                return
+            prefixes = (f"models:/{model_name}/", f"models:/{model_name}@")
+            for key in [k for k in self._models if k[0].startswith(prefixes)]:
+                del self._models[key]
+
+
+# shared by the forecasters of this process
+MODEL_CACHE = ModelCache()
@@ -0,0 +1,101 @@
+import mlflow.prophet
+import pandas as pd
+from mlflow.models import infer_signature
+from prophet import Prophet, serialize
+from prophet.diagnostics import performance_metrics
+
+from epm.models.engine import ModelBackend
+from epm.models.prophet.cv_cache import cached_cross_validation
+from epm.models.prophet.warm_start import load_warm_start_params
+from epm.models.timeseries import TimeSeries
+
+
+class ProphetBackend(ModelBackend):
+    """
+    Prophet models, with a linear trend or a logistic one saturating
+    between `floor` and `cap`.
+    """
+
+    artifact_path = "prophet"
+    default_params = {
+        'changepoint_range': 0.7,
+        'changepoint_prior_scale': 0.5,
+        'seasonality_prior_scale': 0.1,
+        'seasonality_mode': 'multiplicative'
+    }
+
+    def __init__(self, growth: str = "linear", cap: float = None, floor: float = None, parallel: str = "processes") -> None:
+        """
+        Args
+        ---------
+        `growth`: `str`
+            `"linear"` or `"logistic"`.
+        `cap`, `floor`: `float`
+            the saturation levels of the logistic trend.
+        `parallel`: `str`
+            how the cross-validation cutoffs are fitted, see `cached_cross_validation`.
+        """
+        self.growth = growth
+        self.cap = cap
+        self.floor = floor
+        self.parallel = parallel
+
+    def build(self, params: dict) -> Prophet:
+        return Prophet(growth=self.growth, **params)
+
+    def fit(self, model: Prophet, series: TimeSeries, **fit_kwargs) -> Prophet:
+        return model.fit(self._with_bounds(series.frame), **fit_kwargs)
+
+    def predict(self, model: Prophet, series: TimeSeries, n_steps: int, include_history: bool = True) -> pd.DataFrame:
+        future = model.make_future_dataframe(
+            periods=n_steps,
+            freq=series.step,
+            include_history=include_history
+        )
+        return model.predict(self._with_bounds(future))
+
+    def cross_validate(self, model: Prophet, series: TimeSeries, horizon: str, period: str, initial: str) -> pd.DataFrame:
+        return cached_cross_validation(
+            model=model,
+            horizon=horizon,
+            period=period,
+            initial=initial,
+            parallel=self.parallel,
+        )
+
+    def evaluate(self, df_cv: pd.DataFrame, metrics: list) -> dict:
+        cv_metrics = performance_metrics(df_cv)
+        return {k: cv_metrics[k].mean() for k in metrics}
+
+    def params(self, model: Prophet) -> dict:
+        return {attr: getattr(model, attr) for attr in serialize.SIMPLE_ATTRIBUTES}
+
+    def warm_start(self, model_uri: str) -> dict:
+        return {"init": load_warm_start_params(model_uri)}
+
+    def log_model(self, model: Prophet, artifact_path: str, series: TimeSeries, predictions: pd.DataFrame):
+        return mlflow.prophet.log_model(
+            model,
+            artifact_path=artifact_path,
+            signature=infer_signature(model.history, predictions)
+        )
+
+    def load_model(self, model_uri: str) -> Prophet:
+        return mlflow.prophet.load_model(model_uri)
+
+    def _with_bounds(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.growth != "logistic":
+            return df
+        return df.assign(cap=self.cap, floor=self.floor)
+
+
+class LogisticProphetBackend(ProphetBackend):
+    """
+    Prophet model with a logistic trend, by default saturating between 0 and 10000.
+    """
+
+    artifact_path = "prophet_logistic_growth"
+    default_params = {**ProphetBackend.default_params, 'changepoint_range': 0.8}
+
+    def __init__(self, cap: float = 10000, floor: float = 0, parallel: str = "processes") -> None:
+        super().__init__(growth="logistic", cap=cap, floor=floor, parallel=parallel)
@@ -0,0 +1,195 @@
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import pandas as pd
+from prophet.diagnostics import prophet_copy
+from prophet.serialize import model_from_json, model_to_json
+
+from epm.models.engine import anchored_cutoffs
+
+# constructor options that change the fit of a Prophet model
+MODEL_PARAMS = [
+    "growth",
+    "n_changepoints",
+    "changepoint_range",
+    "yearly_seasonality",
+    "weekly_seasonality",
+    "daily_seasonality",
+    "seasonality_mode",
+    "seasonality_prior_scale",
+    "changepoint_prior_scale",
+    "holidays_prior_scale",
+    "mcmc_samples",
+    "interval_width",
+    "uncertainty_samples",
+]
+
+
+def cutoff_key(model, history: pd.DataFrame, cutoff: pd.Timestamp) -> str:
+    """
+    Hash of the model options and of the data up to the cutoff, i.e. of
+    everything the model fitted at that cutoff depends on.
+    """
+    params = {attr: getattr(model, attr) for attr in MODEL_PARAMS}
+    params["seasonalities"] = model.seasonalities
+    params["extra_regressors"] = model.extra_regressors
+    params["fit_kwargs"] = _fit_kwargs(model)
+    params["cutoff"] = cutoff
+
+    # only the input columns: the scaled ones depend on the whole series
+    columns = _predict_columns(model) + ["y"]
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(pd.util.hash_pandas_object(history[columns], index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _fit_kwargs(model) -> dict:
+    # a warm-start `init` only changes where the optimisation starts from
+    return {k: v for k, v in model.fit_kwargs.items() if k != "init"}
+
+
+def _fit_cutoff(model, history: pd.DataFrame, fit_kwargs: dict) -> str:
+    model.fit(history, **fit_kwargs)
+    return model_to_json(model)
+
+
+def _load_cutoff(path: str):
+    """
+    The model saved at `path`, or `None` when it is missing or unreadable,
+    e.g. truncated by a process killed while writing it.
+    """
+    try:
+        with open(path) as f:
+            model = model_from_json(f.read())
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    # the last use is the modification time, see `_evict`
+    os.utime(path)
+    return model
+
+
+def _save_cutoff(path: str, model_json: str) -> None:
+    # write aside and swap, so that a reader never loads a partial model
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(model_json)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _evict(cache_dir: str, max_entries: int, keep: set) -> None:
+    """
+    Removes the least recently used models beyond `max_entries`, never
+    the ones in `keep`.
+    """
+    paths = glob.glob(os.path.join(cache_dir, "*.json"))
+    if len(paths) <= max_entries:
+        return
+    for path in sorted(paths, key=os.path.getmtime)[:len(paths) - max_entries]:
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # removed by another process at the same time
+            pass
+
+
+def _predict_columns(model) -> list:
+    columns = ["ds"]
+    if model.growth == "logistic":
+        columns.append("cap")
+        if model.logistic_floor:
+            columns.append("floor")
+    columns.extend(model.extra_regressors.keys())
+    columns.extend([
+        props["condition_name"]
+        for props in model.seasonalities.values()
+        if props["condition_name"] is not None
+    ])
+    return columns
+
+
+def cached_cross_validation(
+        model,
+        horizon: str,
+        period: str,
+        initial: str,
+        cache_dir: str = "data/cv_cache",
+        parallel: str = "processes",
+        max_entries: int = 500
+    ) -> pd.DataFrame:
+    """
+    Same output as `prophet.diagnostics.cross_validation`, but the model fitted
+    at every cutoff is saved in `cache_dir`, keyed by the model options and
+    the data up to the cutoff, and the missing ones are fitted in parallel.
+
+    Retraining after changing only the horizon, or after a new week of data,
+    re-fits only the cutoffs that did not exist before. Beyond `max_entries`
+    models, the least recently used ones are removed.
+
+    Args
+    ---------
+    `model`: `Prophet`
+        the fitted model, whose history and options are cross-validated.
+    `horizon`, `period`, `initial`: `str`
+        as in `cross_validation`, e.g. `"28 days"`.
+    `cache_dir`: `str`
+        directory of the fitted models, one json file per cutoff.
+    `parallel`: `str`
+        `"processes"`, `"threads"` or `None`, how to fit the missing cutoffs.
+    `max_entries`: `int`
+        the maximum number of models kept in `cache_dir`.
+
+    Returns
+    --------
+    `df_cv`: `pd.DataFrame`
+        with columns `ds`, `yhat`, `yhat_lower`, `yhat_upper`, `y` and `cutoff`.
+    """
+    df = model.history.copy().reset_index(drop=True)
+    horizon, period, initial = pd.Timedelta(horizon), pd.Timedelta(period), pd.Timedelta(initial)
+    cutoffs = anchored_cutoffs(df, horizon, initial, period)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    histories = {cutoff: df[df["ds"] <= cutoff] for cutoff in cutoffs}
+    paths = {
+        cutoff: os.path.join(cache_dir, cutoff_key(model, histories[cutoff], cutoff) + ".json")
+        for cutoff in cutoffs
+    }
+    models = {cutoff: _load_cutoff(paths[cutoff]) for cutoff in cutoffs}
+    missing = [cutoff for cutoff in cutoffs if models[cutoff] is None]
+
+    if len(missing) > 0:
+        copies = [prophet_copy(model, cutoff) for cutoff in missing]
+        args = (copies, [histories[c] for c in missing], [_fit_kwargs(model)] * len(missing))
+        if parallel == "processes":
+            with concurrent.futures.ProcessPoolExecutor() as pool:
+                fitted = list(pool.map(_fit_cutoff, *args))
+        elif parallel == "threads":
+            with concurrent.futures.ThreadPoolExecutor() as pool:
+                fitted = list(pool.map(_fit_cutoff, *args))
+        else:
+            fitted = list(map(_fit_cutoff, *args))
+        for cutoff, model_json in zip(missing, fitted):
+            _save_cutoff(paths[cutoff], model_json)
+            models[cutoff] = model_from_json(model_json)
+    _evict(cache_dir, max_entries, keep=set(paths.values()))
+
+    predictions = []
+    for cutoff in cutoffs:
+        m = models[cutoff]
+        index_predicted = (df["ds"] > cutoff) & (df["ds"] <= cutoff + horizon)
+        yhat = m.predict(df[index_predicted][_predict_columns(m)])
+        predictions.append(pd.concat([
+            yhat[["ds", "yhat", "yhat_lower", "yhat_upper"]],
+            df[index_predicted][["y"]].reset_index(drop=True),
+            pd.DataFrame({"cutoff": [cutoff] * len(yhat)})
+        ], axis=1))
+
+    return pd.concat(predictions, axis=0).reset_index(drop=True)
@@ -0,0 +1,30 @@
+import mlflow.prophet
+import numpy as np
+
+
+def warm_start_params(model) -> dict:
+    """
+    Retrieves the parameters of a fitted Prophet model in the format of
+    the `init` argument of `Prophet.fit`, so that a new fit on a slightly
+    longer history starts its Stan optimisation from the previous optimum.
+    """
+    res = {}
+    for pname in ["k", "m", "sigma_obs"]:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0][0]
+        else:
+            res[pname] = np.mean(model.params[pname])
+    for pname in ["delta", "beta"]:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0]
+        else:
+            res[pname] = np.mean(model.params[pname], axis=0)
+    return res
+
+
+def load_warm_start_params(model_uri: str) -> dict:
+    """
+    Loads a Prophet model logged with MLflow and returns its parameters
+    to warm-start a refit (see `warm_start_params`).
+    """
+    return warm_start_params(mlflow.prophet.load_model(model_uri))
@@ -0,0 +1,168 @@
+import argparse
+import datetime
+import os
+import time
+
+import pandas as pd
+
+from epm.commodities import COMMODITIES
+from epm.models.batch import training_data
+from epm.models.engine import ModelBackend
+from epm.models.forecast_store import FORECAST_COLUMNS, ForecastStore
+from epm.models.model_cache import MODEL_CACHE
+from epm.models.timeseries import TimeSeries
+from epm.scraping_utils.cache import PriceCache
+from epm.tracing import span
+
+RESULT_COLUMNS = ["commodity", "model_uri", "horizon", "step", "ds"] + FORECAST_COLUMNS
+
+
+def load_backend(model_uri: str):
+    """
+    Returns the backend of a logged model, found from its MLflow flavor,
+    and the model itself, loaded through `MODEL_CACHE`.
+    """
+    # imported here, so that importing the service does not load mlflow,
+    # and xgboost is only loaded to score xgboost models
+    import mlflow
+
+    flavors = mlflow.models.get_model_info(model_uri).flavors
+    if "prophet" in flavors:
+        from epm.models.prophet.backend import LogisticProphetBackend, ProphetBackend
+        model = MODEL_CACHE.load(model_uri, ProphetBackend().load_model)
+        backend = LogisticProphetBackend() if model.growth == "logistic" else ProphetBackend()
+        return backend, model
+    if "xgboost" in flavors:
+        from epm.models.xgbforecaster.backend import XGBoostBackend
+        model = MODEL_CACHE.load(model_uri, XGBoostBackend().load_model)
+        # the model is fitted on the lags only, so they are its features
+        return XGBoostBackend(n_lags=model.n_features_in_), model
+    raise ValueError(f"No backend for the flavors {', '.join(flavors)} of {model_uri}")
+
+
+def score(
+        requests: list,
+        price_cache: PriceCache = None,
+        forecast_store: ForecastStore = None
+    ) -> pd.DataFrame:
+    """
+    Forecasts many commodities, models and horizons at once.
+
+    Requests for the same model share one prediction, over their longest
+    horizon, and requests for the same commodity share its price series.
+
+    Args
+    ---------
+    `requests`: `list`
+        `(commodity, model_uri, horizon)` tuples, with the horizon in steps
+        (weeks) of the series; a `None` model uri scores the model of the
+        forecast stored by the batch job (see `epm.models.batch`).
+
+    Returns
+    --------
+    `forecasts`: `pd.DataFrame`
+        one row per request and step ahead, with columns `commodity`,
+        `model_uri`, `horizon`, `step`, `ds`, `yhat`, `yhat_lower` and
+        `yhat_upper` (the bounds are missing for models without intervals).
+    """
+    price_cache = price_cache if price_cache is not None else PriceCache()
+    forecast_store = forecast_store if forecast_store is not None else ForecastStore()
+
+    groups = {}
+    for commodity, model_uri, horizon in requests:
+        if commodity not in COMMODITIES:
+            raise KeyError(f"Unknown commodity: {commodity}")
+        if model_uri is None:
+            model_uri = forecast_store.read_meta(commodity).get("model_uri")
+            if model_uri is None:
+                raise KeyError(f"No stored forecast, hence no model, for {commodity}")
+        groups.setdefault((commodity, model_uri), set()).add(int(horizon))
+
+    series = {}
+    results = []
+    for (commodity, model_uri), horizons in groups.items():
+        if commodity not in series:
+            series[commodity] = TimeSeries.from_frame(
+                training_data(commodity, price_cache), COMMODITIES[commodity]["column"]
+            )
+        backend, model = load_backend(model_uri)
+        predictions = predict_future(backend, model, series[commodity], max(horizons))
+        for horizon in sorted(horizons):
+            results.append(
+                predictions.head(horizon).assign(
+                    commodity=commodity, model_uri=model_uri, horizon=horizon
+                )
+            )
+
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(results, axis=0, ignore_index=True)[RESULT_COLUMNS]
+
+
+def predict_future(backend: ModelBackend, model, series: TimeSeries, n_steps: int) -> pd.DataFrame:
+    """
+    The out-of-sample predictions of a model, numbered by `step`, with the
+    columns of `FORECAST_COLUMNS`.
+    """
+    with span("model.predict", backend=type(backend).__name__, n_steps=n_steps):
+        predictions = backend.predict(model, series, n_steps=n_steps, include_history=False)
+    predictions = predictions.reset_index(drop=True).reindex(columns=["ds"] + FORECAST_COLUMNS)
+    predictions.insert(0, "step", range(1, len(predictions) + 1))
+    return predictions
+
+
+def nightly_report(
+        horizons: list,
+        commodities: list = None,
+        model_uris: dict = None,
+        price_cache: PriceCache = None,
+        forecast_store: ForecastStore = None
+    ) -> pd.DataFrame:
+    """
+    Scores every horizon of every commodity, with the given models or the
+    ones of the stored forecasts, skipping the commodities without a model.
+    """
+    forecast_store = forecast_store if forecast_store is not None else ForecastStore()
+    model_uris = model_uris or {}
+    requests = []
+    for commodity in commodities or COMMODITIES:
+        model_uri = model_uris.get(commodity) or forecast_store.read_meta(commodity).get("model_uri")
+        if model_uri is None:
+            print(f"No model for {commodity}, skipped")
+            continue
+        requests += [(commodity, model_uri, horizon) for horizon in horizons]
+    return score(requests, price_cache=price_cache, forecast_store=forecast_store)
+
+
+if __name__ == "__main__":
+    # meant to be scheduled after the data is refreshed, e.g. every night with cron:
+    # 0 2 * * *  cd /path/to/epm && python -m epm.models.scoring --horizons 4 12 52
+    parser = argparse.ArgumentParser(
+        description="Forecasts every commodity and horizon in one process and writes a report."
+    )
+    parser.add_argument(
+        "commodities", nargs="*", help=f"any of {', '.join(COMMODITIES)}, all by default"
+    )
+    parser.add_argument(
+        "--horizons", type=int, nargs="+", default=[4, 12, 52], help="weeks to forecast"
+    )
+    parser.add_argument(
+        "--model", action="append", default=[], metavar="COMMODITY=URI",
+        help="model to score for a commodity, the one of its stored forecast by default"
+    )
+    parser.add_argument(
+        "--output", default=f"data/reports/forecast_{datetime.date.today().isoformat()}.csv",
+        help="path of the CSV report"
+    )
+    args = parser.parse_args()
+    unknown = set(args.commodities) - set(COMMODITIES)
+    if unknown:
+        parser.error(f"unknown commodities: {', '.join(sorted(unknown))}")
+    model_uris = dict(model.split("=", 1) for model in args.model)
+
+    start = time.perf_counter()
+    report = nightly_report(args.horizons, args.commodities, model_uris)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    report.to_csv(args.output, index=False)
+    print(report.groupby(["commodity", "horizon"]).size().to_string())
+    print(f"Scored {len(report)} rows in {time.perf_counter() - start:.2f}s, written to {args.output}")
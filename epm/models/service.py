@@ -0,0 +1,210 @@
+import argparse
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from epm.commodities import COMMODITIES
+from epm.models.forecast_store import ForecastStore
+from epm.models.model_cache import MODEL_CACHE
+from epm.models.scoring import score
+from epm.scraping_utils.cache import PriceCache
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, the others wait for its result (or its exception).
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            call.set_result(fn())
+        except Exception as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+
+class ForecastService:
+    """
+    Forecasts of the commodities for other systems, served over HTTP by
+    `serve`.
+
+    The models stay loaded in `MODEL_CACHE`, concurrent identical requests
+    are computed once, and responses are cached by commodity, model uri,
+    registry version and steps: a new forecast stored by the batch job is
+    served by its own model uri, and a new registry version of a `models:/`
+    uri drops the responses of the previous one. The responses of models
+    no longer requested are evicted by the LRU.
+    """
+
+    def __init__(
+            self,
+            price_cache: PriceCache = None,
+            forecast_store: ForecastStore = None,
+            max_entries: int = 256
+        ) -> None:
+        """
+        Args
+        ---------
+        `max_entries`: `int`
+            number of responses kept, the least recently used is evicted first.
+        """
+        self.price_cache = price_cache if price_cache is not None else PriceCache()
+        self.forecast_store = forecast_store if forecast_store is not None else ForecastStore()
+        self.max_entries = max_entries
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.computations = 0
+
+    def forecast(self, commodity: str, steps: int, model_uri: str = None) -> bytes:
+        """
+        Returns the JSON forecast of the next `steps` periods of a commodity,
+        with the model at `model_uri` or the one of its stored forecast.
+        """
+        if commodity not in COMMODITIES:
+            raise KeyError(f"Unknown commodity: {commodity}")
+        if model_uri is None:
+            model_uri = self.forecast_store.read_meta(commodity).get("model_uri")
+            if model_uri is None:
+                raise KeyError(f"No model for {commodity}")
+        key = (commodity, model_uri, MODEL_CACHE.resolve_version(model_uri), steps)
+
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                self.hits += 1
+                return self._responses[key]
+        return self._flight.do(key, lambda: self._compute(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "responses": len(self._responses),
+                "hits": self.hits,
+                "computations": self.computations,
+                "model_cache": {"hits": MODEL_CACHE.hits, "misses": MODEL_CACHE.misses},
+            }
+
+    def _compute(self, key: tuple) -> bytes:
+        commodity, model_uri, version, steps = key
+        predictions = score(
+            [(commodity, model_uri, steps)],
+            price_cache=self.price_cache,
+            forecast_store=self.forecast_store
+        )
+        body = json.dumps({
+            "commodity": commodity,
+            "model_uri": model_uri,
+            "model_version": version,
+            "steps": steps,
+            "forecast": json.loads(
+                predictions[["ds", "yhat", "yhat_lower", "yhat_upper"]].to_json(
+                    orient="records", date_format="iso"
+                )
+            ),
+        }).encode()
+        with self._lock:
+            self.computations += 1
+            # the responses of the previous registry versions of the model are stale
+            for stale in [k for k in self._responses if k[:2] == key[:2] and k[2] != version]:
+                del self._responses[stale]
+            self._responses[key] = body
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+        return body
+
+
+def make_handler(service: ForecastService):
+    """
+    Returns the request handler class serving `service`.
+    """
+
+    class ForecastHandler(BaseHTTPRequestHandler):
+        # keeps the connections of load tests and clients alive
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            query = parse_qs(url.query)
+            if parts == ["health"]:
+                return self._send(200, json.dumps(service.stats()).encode())
+            if len(parts) != 2 or parts[0] != "forecast":
+                return self._error(404, f"Unknown path: {url.path}")
+            try:
+                steps = int(query.get("steps", ["4"])[0])
+            except ValueError:
+                return self._error(400, "steps must be an integer")
+            if steps < 1:
+                return self._error(400, "steps must be positive")
+            try:
+                body = service.forecast(parts[1], steps, query.get("model", [None])[0])
+            except KeyError as e:
+                return self._error(404, e.args[0])
+            except Exception as e:
+                return self._error(500, f"{type(e).__name__}: {e}")
+            self._send(200, body)
+
+        def log_message(self, format, *args):
+            # one line per request on stdout would slow down the service under load
+            pass
+
+        def _error(self, status: int, message: str):
+            self._send(status, json.dumps({"error": message}).encode())
+
+        def _send(self, status: int, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return ForecastHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, service: ForecastService = None) -> ThreadingHTTPServer:
+    """
+    Returns an HTTP server of the forecasts, one thread per connection:
+
+        GET /forecast/<commodity>?steps=<n>[&model=<model_uri>]
+        GET /health
+
+    Call `serve_forever` to run it.
+    """
+    service = service if service is not None else ForecastService()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves the commodity forecasts over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port)
+    print(f"Serving forecasts on http://{args.host}:{args.port}/forecast/<commodity>?steps=<n>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+class TimeSeries:
+    """
+    Immutable univariate time series handed by `ForecastEngine` to the model
+    backends: the dates (`ds`) and values (`y`) are read-only arrays, held
+    once, and slicing a series returns views of them.
+
+    The frequency is inferred once and cached, and the `ds`/`y` DataFrame
+    expected by Prophet is built on demand on top of the same arrays.
+    """
+
+    __slots__ = ("_ds", "_y", "_freq", "_frame")
+
+    def __init__(self, ds, y, freq: str = None) -> None:
+        """
+        Args
+        ---------
+        `ds`: array-like
+            the dates, sorted.
+        `y`: array-like
+            the values, as many as the dates.
+        `freq`: `str`
+            the frequency of the dates, inferred when `None`.
+        """
+        self._ds = self._readonly(np.asarray(ds, dtype="datetime64[ns]"))
+        self._y = self._readonly(np.asarray(y, dtype="float64"))
+        if len(self._ds) != len(self._y):
+            raise ValueError("ds and y must have the same length")
+        self._freq = freq
+        self._frame = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, target_col: str, date_col: str = "index") -> "TimeSeries":
+        """
+        Reads a series from a column of a DataFrame, with the dates in its
+        index or in `date_col`, without modifying the DataFrame.
+        """
+        ds = df.index if date_col == "index" else df[date_col]
+        return cls(ds, df[target_col].to_numpy(dtype="float64", copy=False))
+
+    @property
+    def ds(self) -> np.ndarray:
+        return self._ds
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._y
+
+    @property
+    def freq(self) -> str:
+        if self._freq is None and len(self._ds) >= 3:
+            self._freq = pd.infer_freq(self._ds)
+        return self._freq
+
+    @property
+    def step(self):
+        """
+        The spacing of the future dates: the frequency of the series, or the
+        median spacing of its dates when none can be inferred, e.g. when an
+        observation is missing.
+        """
+        if self.freq is not None:
+            return self.freq
+        if len(self._ds) < 2:
+            raise ValueError("At least two dates are needed to infer the spacing of a series")
+        return pd.Timedelta(np.median(np.diff(self._ds)))
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        The series as a DataFrame with columns `ds` and `y`, backed by the
+        read-only arrays of the series.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame({"ds": self._ds, "y": self._y}, copy=False)
+        return self._frame
+
+    def __len__(self) -> int:
+        return len(self._y)
+
+    def __getitem__(self, key: slice) -> "TimeSeries":
+        if not isinstance(key, slice):
+            raise TypeError("TimeSeries can only be sliced")
+        return TimeSeries(self._ds[key], self._y[key], freq=self._freq)
+
+    def until(self, date) -> "TimeSeries":
+        """
+        The observations up to `date` included, as a view.
+        """
+        end = np.searchsorted(self._ds, np.datetime64(pd.Timestamp(date)), side="right")
+        return self[:end]
+
+    def between(self, start, end) -> "TimeSeries":
+        """
+        The observations after `start` and up to `end` included, as a view.
+        """
+        first = np.searchsorted(self._ds, np.datetime64(pd.Timestamp(start)), side="right")
+        last = np.searchsorted(self._ds, np.datetime64(pd.Timestamp(end)), side="right")
+        return self[first:last]
+
+    def _readonly(self, values: np.ndarray) -> np.ndarray:
+        # a view, so that the caller's array stays writeable
+        values = values.view()
+        values.flags.writeable = False
+        return values
@@ -0,0 +1,165 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from epm.jobs import JobQueue
+
+# seconds between two heartbeats of a worker, and after which a silent worker is considered dead
+HEARTBEAT = 5
+HEARTBEAT_TIMEOUT = 30
+
+
+def make_forecaster(kind: str):
+    """
+    Returns the forecaster that runs a training job of the given kind.
+    """
+    # imported here, so that a worker only loads the libraries of the jobs it runs
+    if kind == "prophet":
+        from epm.models.prophet.forecaster import Forecaster
+        return Forecaster()
+    if kind == "prophet_logistic":
+        from epm.models.prophet.forecaster_log import LogisticGrowthForecaster
+        return LogisticGrowthForecaster()
+    if kind == "xgboost":
+        from epm.models.engine import ForecastEngine
+        from epm.models.xgbforecaster.backend import XGBoostBackend
+        return ForecastEngine(XGBoostBackend(n_lags=4))
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+def run_job(kind: str, params: dict) -> dict:
+    """
+    Trains the model of a commodity, as requested by the pages.
+
+    Args
+    ---------
+    `kind`: `str`
+        `prophet`, `prophet_logistic` or `xgboost`.
+    `params`: `dict`
+        the `commodity`, the `data_version` of its prices saved with
+        `snapshot_training_data`, and the keyword arguments of
+        `ForecastEngine.train_model`, e.g. `horizon`, `period` and `initial`.
+
+    Returns
+    --------
+    `result`: `dict`
+        the `model_uri` of the trained model.
+    """
+    from epm.commodities import COMMODITIES
+    from epm.models.batch import read_snapshot, training_data
+    from epm.scraping_utils.cache import PriceCache
+
+    params = dict(params)
+    commodity = params.pop("commodity")
+    data_version = params.pop("data_version", None)
+    settings = COMMODITIES[commodity]
+    if data_version is not None:
+        train_df = read_snapshot(data_version)
+    else:
+        # jobs queued before they carried their data
+        train_df = training_data(commodity, PriceCache())
+    forecaster = make_forecaster(kind)
+    model_uri = forecaster.train_model(
+        experiment_name=settings["experiment_name"],
+        train_df=train_df,
+        target_col=settings["column"],
+        artifact_path=settings["artifact_path"],
+        **params
+    )
+    return {"model_uri": model_uri}
+
+
+def work(queue_path: str, poll: float = 1.0) -> None:
+    """
+    Runs the queued jobs one at a time, forever.
+    """
+    queue = JobQueue(queue_path)
+    pid = os.getpid()
+
+    def beat():
+        while True:
+            queue.heartbeat(pid)
+            time.sleep(HEARTBEAT)
+
+    threading.Thread(target=beat, daemon=True).start()
+    while True:
+        queue.requeue_orphans(HEARTBEAT_TIMEOUT)
+        job = queue.claim(pid)
+        if job is None:
+            time.sleep(poll)
+            continue
+        print(f"Worker {pid}: running job {job['id']} ({job['kind']})")
+        try:
+            queue.finish(job["id"], run_job(job["kind"], job["params"]))
+        except Exception:
+            queue.fail(job["id"], traceback.format_exc())
+
+
+def ensure_workers(queue: JobQueue, n_workers: int = 2) -> None:
+    """
+    Starts a detached pool of `n_workers` processes, unless workers of the
+    same queue are already alive.
+
+    The check and the start happen under a lock file next to the queue, so
+    that sessions calling this at the same time start a single pool: the
+    others wait for its first heartbeat.
+    """
+    if queue.live_workers(HEARTBEAT_TIMEOUT):
+        return
+    lock_path = queue.path + ".spawn.lock"
+    if not _acquire_spawn_lock(lock_path):
+        _wait_for_workers(queue)
+        return
+    try:
+        # the pool may have started between the first check and the lock
+        if not queue.live_workers(HEARTBEAT_TIMEOUT):
+            subprocess.Popen(
+                [sys.executable, "-m", "epm.models.worker", "--workers", str(n_workers), "--queue", queue.path],
+                start_new_session=True,
+            )
+            _wait_for_workers(queue)
+    finally:
+        os.remove(lock_path)
+
+
+def _acquire_spawn_lock(path: str) -> bool:
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        # a process that died while starting the pool leaves its lock behind,
+        # the others hold it at most for the first heartbeat
+        try:
+            if time.time() - os.path.getmtime(path) > 2 * HEARTBEAT_TIMEOUT:
+                os.remove(path)
+                return _acquire_spawn_lock(path)
+        except FileNotFoundError:
+            return _acquire_spawn_lock(path)
+        return False
+
+
+def _wait_for_workers(queue: JobQueue) -> None:
+    deadline = time.time() + HEARTBEAT_TIMEOUT
+    while not queue.live_workers(HEARTBEAT_TIMEOUT) and time.time() < deadline:
+        time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the training jobs queued by the pages.")
+    parser.add_argument("--workers", type=int, default=2, help="number of worker processes")
+    parser.add_argument("--queue", default="data/jobs.sqlite", help="path of the job queue")
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=work, args=(args.queue,))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
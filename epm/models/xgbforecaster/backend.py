@@ -0,0 +1,95 @@
+import mlflow.xgboost
+import numpy as np
+import pandas as pd
+from mlflow.models import infer_signature
+from xgboost import XGBRegressor
+
+from epm.models.engine import ModelBackend
+from epm.models.timeseries import TimeSeries
+from epm.models.xgbforecaster.search import TimeSeriesSearch
+from epm.models.xgbforecaster.utils.preprocessing import Preprocessing
+from epm.models.xgbforecaster.xgbforecaster import XGBForecaster
+
+
+class XGBoostBackend(ModelBackend):
+    """
+    Autoregressive XGBoost model: every value is predicted from the `n_lags`
+    previous ones, and forecasts are rolled forward with `XGBForecaster.forecast_batch`.
+
+    When a `param_grid` is given, every fit searches it with `TimeSeriesSearch`
+    and keeps the best estimator, refitted on all the data with the `fit_kwargs`;
+    the cross-validation cutoffs refit the configuration found, without searching
+    again, so their metrics are slightly optimistic.
+
+    Models are always trained from scratch: continuing the boosting of a logged
+    model would add trees at every retraining, fitted with other parameters.
+    """
+
+    artifact_path = "XGBoost"
+    default_params = {}
+
+    def __init__(self, n_lags: int = 1, param_grid: dict = None, n_splits: int = 5) -> None:
+        self.n_lags = n_lags
+        self.param_grid = param_grid
+        self.n_splits = n_splits
+
+    def build(self, params: dict) -> XGBRegressor:
+        return XGBRegressor(**params)
+
+    def fit(self, model: XGBRegressor, series: TimeSeries, **fit_kwargs) -> XGBRegressor:
+        windows = Preprocessing.lag_matrix(series.y, self.n_lags)[:, :, 0]
+        X, y = windows[:, :-1], windows[:, -1]
+        if self.param_grid is None:
+            return model.fit(X, y, **fit_kwargs)
+        search = TimeSeriesSearch(self.param_grid, n_splits=self.n_splits).fit(X, y, **fit_kwargs)
+        return search.best_estimator_
+
+    def predict(self, model: XGBRegressor, series: TimeSeries, n_steps: int, include_history: bool = True) -> pd.DataFrame:
+        values = series.y
+        future = XGBForecaster().forecast_batch(
+            model=model,
+            rows_just_before=values[-(self.n_lags + 1):].reshape(1, -1),
+            steps_ahead=n_steps
+        )[0]
+        dates = pd.date_range(series.ds[-1], periods=n_steps + 1, freq=series.step)[1:]
+        predictions = pd.DataFrame({"ds": dates, "yhat": future})
+        if include_history:
+            # one-step-ahead predictions, none for the first lags
+            windows = Preprocessing.lag_matrix(values, self.n_lags)[:, :-1, 0]
+            in_sample = np.full(len(values), np.nan)
+            in_sample[self.n_lags:] = model.predict(windows)
+            predictions = pd.concat([
+                pd.DataFrame({"ds": series.ds, "yhat": in_sample}),
+                predictions
+            ], axis=0).reset_index(drop=True)
+        return predictions
+
+    def clone(self, model: XGBRegressor) -> XGBRegressor:
+        return XGBRegressor(**model.get_params())
+
+    def params(self, model: XGBRegressor) -> dict:
+        params = {k: v for k, v in model.get_params().items() if v is not None}
+        params["n_lags"] = self.n_lags
+        return params
+
+    def cross_validate(self, model: XGBRegressor, series: TimeSeries, horizon: str, period: str, initial: str) -> pd.DataFrame:
+        if self.param_grid is None:
+            return super().cross_validate(model, series, horizon, period, initial)
+        # the best configuration, already in `model`, is refitted at every cutoff
+        searched = XGBoostBackend(n_lags=self.n_lags)
+        return searched.cross_validate(model, series, horizon, period, initial)
+
+    def warm_start(self, model_uri: str) -> dict:
+        # retrained from scratch, see the class docstring
+        return {}
+
+    def log_model(self, model: XGBRegressor, artifact_path: str, series: TimeSeries, predictions: pd.DataFrame):
+        windows = Preprocessing.lag_matrix(series.y, self.n_lags)[:, :-1, 0]
+        return mlflow.xgboost.log_model(
+            model,
+            artifact_path=artifact_path,
+            signature=infer_signature(windows, model.predict(windows))
+        )
+
+    def load_model(self, model_uri: str) -> XGBRegressor:
+        return mlflow.xgboost.load_model(model_uri)
@@ -4,6 +4,8 @@ import mlflow.xgboost
 from mlflow.tracking import MlflowClient
 from mlflow.exceptions import MlflowException
 
+from epm.models.model_cache import MODEL_CACHE
+
 def register_model(metric: str, threshold: float, experiment_name: str, model_name: str)-> None:
     """
         Register a model from the last experiment run if its metric is below a certain threshold
@@ -27,6 +29,7 @@ def register_model(metric: str, threshold: float, experiment_name: str, model_na
                 source=model_uri,
                 run_id=latest_run.info.run_id
             )
+            MODEL_CACHE.invalidate(model_name)
             print(f"Model registered: name={model_name}")
         else:
             print(f"MAPE is above the threshold ({threshold}), model not registered.")
@@ -0,0 +1,128 @@
+import math
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_percentage_error
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+from xgboost import XGBRegressor
+
+
+def _fit_fold(params, X, y, train_idx, test_idx, n_estimators, early_stopping_rounds, val_frac):
+    """
+    Fits one configuration on one expanding-window fold. The most recent
+    `val_frac` of the training window is held out for early stopping, so the
+    test fold is only used for scoring.
+    """
+    n_val = max(1, int(len(train_idx) * val_frac))
+    fit_idx, val_idx = train_idx[:-n_val], train_idx[-n_val:]
+    model = XGBRegressor(
+        n_estimators=n_estimators,
+        early_stopping_rounds=early_stopping_rounds,
+        n_jobs=1,
+        **params
+    )
+    model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+    score = mean_absolute_percentage_error(y[test_idx], model.predict(X[test_idx]))
+    return score, model.best_iteration + 1
+
+
+class TimeSeriesSearch:
+    """
+    Hyperparameter search for `XGBRegressor` on time-series data.
+
+    * configurations are scored on expanding-window splits (`TimeSeriesSplit`),
+      so that a model is never validated on data older than its training set;
+    * successive halving: every configuration is first scored on the most
+      recent fold only, then the best `1 / factor` of them on `factor` times
+      more folds, and so on until the survivors are scored on all of them;
+    * boosting rounds are cut by XGBoost early stopping on a hold-out at the
+      end of each training window;
+    * the fits of each rung run in parallel across cores.
+
+    Like `GridSearchCV`, the best configuration is refitted on all the data
+    and used by `predict`; the keyword arguments of `fit` are passed to
+    this refit only, e.g. `xgb_model` to continue boosting a logged model.
+    """
+
+    def __init__(
+            self,
+            param_grid: dict,
+            n_splits: int = 5,
+            factor: int = 3,
+            n_estimators: int = 100,
+            early_stopping_rounds: int = 20,
+            val_frac: float = 0.1,
+            n_jobs: int = -1,
+            verbose: int = 0
+        ) -> None:
+        self.param_grid = param_grid
+        self.n_splits = max(2, n_splits)
+        self.factor = factor
+        self.n_estimators = n_estimators
+        self.early_stopping_rounds = early_stopping_rounds
+        self.val_frac = val_frac
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def fit(self, X, y, **fit_kwargs) -> "TimeSeriesSearch":
+        X, y = np.asarray(X), np.asarray(y)
+        folds = list(TimeSeriesSplit(n_splits=self.n_splits).split(X))
+        candidates = list(ParameterGrid(self.param_grid))
+        # scores and best iterations of every (candidate, fold) already fitted
+        results = {}
+
+        n_rungs = max(1, math.ceil(math.log(len(candidates), self.factor)) + 1)
+        for rung in range(n_rungs):
+            n_folds = min(self.n_splits, self.factor ** rung)
+            last = rung == n_rungs - 1 or len(candidates) == 1
+            if last:
+                n_folds = self.n_splits
+            rung_folds = range(self.n_splits - n_folds, self.n_splits)
+
+            tasks = [
+                (c, f) for c in range(len(candidates)) for f in rung_folds
+                if (self._key(candidates[c]), f) not in results
+            ]
+            if self.verbose:
+                print(f"Rung {rung}: {len(candidates)} candidates on {n_folds} folds, {len(tasks)} fits")
+            fitted = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_fold)(
+                    candidates[c], X, y, *folds[f],
+                    self.n_estimators, self.early_stopping_rounds, self.val_frac
+                )
+                for c, f in tasks
+            )
+            for (c, f), result in zip(tasks, fitted):
+                results[(self._key(candidates[c]), f)] = result
+
+            scores = [
+                np.mean([results[(self._key(params), f)][0] for f in rung_folds])
+                for params in candidates
+            ]
+            order = np.argsort(scores)
+            if last:
+                break
+            n_keep = max(1, len(candidates) // self.factor)
+            candidates = [candidates[i] for i in order[:n_keep]]
+
+        self.best_params_ = candidates[order[0]]
+        self.best_score_ = scores[order[0]]
+        self.best_iteration_ = int(np.median([
+            results[(self._key(self.best_params_), f)][1] for f in range(self.n_splits)
+        ]))
+        self.cv_results_ = {
+            "params": [dict(k) for k, _ in results],
+            "fold": [f for _, f in results],
+            "mape": [r[0] for r in results.values()],
+            "best_iteration": [r[1] for r in results.values()],
+        }
+
+        self.best_estimator_ = XGBRegressor(
+            n_estimators=self.best_iteration_, **self.best_params_
+        ).fit(X, y, **fit_kwargs)
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        return self.best_estimator_.predict(X)
+
+    def _key(self, params: dict) -> tuple:
+        return tuple(sorted(params.items()))
@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from epm.tracing import span
+
 
 class Preprocessing:
     def get_data(path: str) -> pd.DataFrame:
@@ -30,9 +32,10 @@ class Preprocessing:
     def train_test_split_df(data: pd.DataFrame, n_test: int) -> pd.DataFrame:
         return data.iloc[:-n_test], data.iloc[-n_test:]
 
+    @span("xgb.series_to_supervised")
     def series_to_supervised(
         data: pd.Series, n_in: int = 1, dropnan: bool = True
-    ) -> np.array:
+    ) -> pd.DataFrame:
         """
         Converts a sequence of numbers, i.e. a univariate time series, into a matrix
         with one array (series at time t) plus one more array for each n_in
@@ -51,15 +54,106 @@ class Preprocessing:
 
         """
         df = pd.DataFrame(data)
-        cols = list()
-        # input sequence (t-n, ... t-1)
-        for i in range(n_in, 0, -1):
-            cols.append(df.shift(i))
-        cols.append(df)
-        # put it all together
-        agg = pd.concat(cols, axis=1)
+        values = df.to_numpy(dtype="float64")
+        if not dropnan:
+            # the first rows have no lags, as with df.shift
+            values = np.vstack([np.full((n_in, values.shape[1]), np.nan), values])
+        windows = Preprocessing.lag_matrix(values, n_in)
+        # (t-n, ... t-1, t) for every column, copied once into a 2D matrix
+        agg = pd.DataFrame(
+            windows.reshape(len(windows), (n_in + 1) * values.shape[1]),
+            index=df.index[len(df) - len(windows):],
+            columns=list(df.columns) * (n_in + 1),
+        )
         # drop rows with NaN values (in particular the first and the last rows)
         if dropnan:
-            agg.dropna(inplace=True)
+            agg = agg[~np.isnan(agg.to_numpy()).any(axis=1)]
 
         return agg
+
+    def lag_matrix(data, n_in: int = 1) -> np.ndarray:
+        """
+        Builds the lags of one or more series as a sliding-window view over
+        their values, without copying them.
+
+        Parameters
+        ----------
+        data: pd.Series, pd.DataFrame or np.ndarray
+            a series of length T, or T observations of C columns.
+        n_in: int
+            number of lags of each column.
+
+        Returns
+        ----------
+        windows: np.ndarray
+            read-only view of shape (T - n_in, n_in + 1, C): `windows[i, j, c]`
+            is column `c` at time `i + j`, so the last step of each window is
+            the value at time t and the previous ones its lags t-n_in, .., t-1;
+            empty when the series has no more than `n_in` observations.
+        """
+        values = np.asarray(data, dtype="float64")
+        if values.ndim == 1:
+            values = values[:, None]
+        if len(values) <= n_in:
+            # too short for a single window, which sliding_window_view rejects
+            windows = np.empty((0, n_in + 1, values.shape[1]))
+            windows.flags.writeable = False
+            return windows
+        return np.lib.stride_tricks.sliding_window_view(
+            values, n_in + 1, axis=0
+        ).swapaxes(1, 2)
+
+    def supervised_features(
+        data, n_in: int = 1, rolling_windows: tuple = (), calendar: bool = False
+    ):
+        """
+        Builds the design matrix of a lag-based regressor for one or more columns,
+        with optional rolling statistics of the lags and calendar features.
+
+        Parameters
+        ----------
+        data: pd.Series or pd.DataFrame
+            the series, indexed by date when `calendar` is set.
+        n_in: int
+            number of lags of each column.
+        rolling_windows: tuple
+            sizes (at most `n_in`) of the windows over which mean, std, min and
+            max of the lags are computed, for each column.
+        calendar: bool
+            whether to add month, week of year, day of week and hour of the target.
+
+        Returns
+        ----------
+        X: np.ndarray
+            features of shape (T - n_in, n_features), lags first.
+        y: np.ndarray
+            targets at time t, of shape (T - n_in, C).
+        index: pd.Index
+            the timestamps of the targets.
+        """
+        windows = Preprocessing.lag_matrix(data, n_in)
+        lags, y = windows[:, :-1, :], windows[:, -1, :]
+        features = [lags.reshape(len(lags), n_in * lags.shape[2])]
+
+        for w in rolling_windows:
+            recent = lags[:, n_in - w:, :]
+            features += [
+                recent.mean(axis=1),
+                recent.std(axis=1),
+                recent.min(axis=1),
+                recent.max(axis=1),
+            ]
+
+        index = data.index[n_in:]
+        if calendar:
+            dates = pd.DatetimeIndex(index)
+            features.append(
+                np.column_stack([
+                    dates.month,
+                    dates.isocalendar().week.to_numpy(),
+                    dates.dayofweek,
+                    dates.hour,
+                ]).astype("float64")
+            )
+
+        return np.hstack(features), np.ascontiguousarray(y), index
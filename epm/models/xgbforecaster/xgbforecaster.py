@@ -3,13 +3,14 @@ import numpy as np
 import mlflow
 import mlflow.xgboost
 from xgboost import XGBModel, XGBRegressor
-from sklearn.model_selection import GridSearchCV
 import subprocess
 from mlflow.tracking import MlflowClient
 from sklearn.metrics import mean_absolute_percentage_error, mean_absolute_error
 from typing import Tuple
 
-from epm.models.utils.preprocessing import Preprocessing
+from epm.models.xgbforecaster.search import TimeSeriesSearch
+from epm.models.xgbforecaster.utils.preprocessing import Preprocessing
+from epm.tracing import span
 
 
 class XGBForecaster:
@@ -43,21 +44,95 @@ class XGBForecaster:
             Rolling prediction with the model_fitted for predicting n=steps_ahead new instances.
             This instances will immediately follow row_just_before, which is the last row of the dataframe available
         """
-        row_just_before = np.asarray(row_just_before)[1:]
-        current_row = row_just_before.reshape(1, -1)
-        forecast = []
-        for _ in range(steps_ahead):
-            pred = model.predict(current_row)
-            forecast.append(pred[0])
-            current_row = np.concatenate((current_row[0][1:], pred)).reshape(1, -1)
-        return forecast
+        forecast = XGBForecaster.forecast_batch(
+            self,
+            model=model,
+            rows_just_before=np.asarray(row_just_before).reshape(1, -1),
+            steps_ahead=steps_ahead
+        )
+        return list(forecast[0])
+
+    def forecast_batch(self,
+                       model: XGBRegressor,
+                       rows_just_before: np.ndarray,
+                       steps_ahead: int
+        ) -> np.ndarray:
+        """
+            Rolling prediction of many series (or many start points of the same series) at once.
+            Each step is a single `predict` over all the rows, and the predictions are written
+            into a preallocated buffer whose sliding windows are the next inputs.
+
+        Parameters
+        ----------
+        model: XGBRegressor
+            a model fitted on rows of lags followed by the target.
+        rows_just_before: np.ndarray
+            of shape (n_series, n_lags + 1), the last available row of each series.
+        steps_ahead: int
+            number of steps to forecast.
+
+        Returns
+        ----------
+        forecast: np.ndarray
+            of shape (n_series, steps_ahead)
+        """
+        rows = np.asarray(rows_just_before, dtype="float64")
+        n_lags = rows.shape[1] - 1
+        buffer = np.empty((rows.shape[0], n_lags + steps_ahead))
+        buffer[:, :n_lags] = rows[:, 1:]
+        for step in range(steps_ahead):
+            buffer[:, n_lags + step] = model.predict(buffer[:, step:step + n_lags])
+        return buffer[:, n_lags:]
+
+    def fit_direct(
+        self, model: XGBRegressor, series: pd.Series, n_in: int, horizon: int
+    ) -> XGBRegressor:
+        """
+        Trains a multi-output XGBRegressor for direct multi-horizon forecasting:
+        from the last `n_in` values, the model predicts the next `horizon` values
+        at once, instead of feeding its own predictions back step by step.
 
+        Returns
+        ---------
+        model: XGBRegressor
+            a fitted instance of the XGBRegressor, with one output per horizon
+        """
+        windows = Preprocessing.lag_matrix(series, n_in + horizon - 1)[:, :, 0]
+        windows = windows[~np.isnan(windows).any(axis=1)]
+        X, y = windows[:, :n_in], windows[:, n_in:]
+        model.fit(X, y)
+        return model
+
+    def forecast_direct(self, model: XGBRegressor, last_values: np.ndarray) -> np.ndarray:
+        """
+        Predicts all the horizons of a model trained with `fit_direct` in a single call.
+
+        Parameters
+        ----------
+        last_values: np.ndarray
+            the last `n_in` values of a series, or an array of shape (n_series, n_in).
+
+        Returns
+        ----------
+        forecast: np.ndarray
+            of shape (n_series, horizon)
+        """
+        X = np.asarray(last_values, dtype="float64")
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return model.predict(X).reshape(len(X), -1)
+
+    @span("xgb.grid_search")
     def grid_search(
         self, parameters, n_folds, train_df, test_size, n_jobs=1, verbose=0
     ):
-        model = self.xgb
-        grid = GridSearchCV(
-            model, parameters, cv=n_folds, n_jobs=n_jobs, verbose=verbose
+        """
+        Searches `parameters` on expanding-window splits of `train_df` with
+        successive halving and early stopping (see `TimeSeriesSearch`), refits
+        the best configuration and forecasts the `test_size` following steps.
+        """
+        grid = TimeSeriesSearch(
+            parameters, n_splits=n_folds, n_jobs=n_jobs, verbose=verbose
         )
         grid = XGBForecaster.fit(self, model=grid, train_ensamble=train_df)
         predictions = XGBForecaster.forecast(
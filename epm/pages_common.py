@@ -0,0 +1,111 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from epm.downsampling import downsample
+from epm.jobs import JobQueue
+from epm.models.forecast_store import ForecastStore
+from epm.models.prophet.forecaster import Forecaster
+from epm.plots import MAX_POINTS, FigureCache, data_version, forecast_figure
+from epm.scraping_utils.cache import PriceCache
+
+# the resources and the charts shared by the commodity pages; resources are
+# created once per server process and shared by all the sessions
+
+
+@st.cache_resource
+def get_price_cache() -> PriceCache:
+    return PriceCache()
+
+
+@st.cache_resource
+def get_forecast_store() -> ForecastStore:
+    return ForecastStore()
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue()
+
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    return FigureCache()
+
+
+@st.cache_resource(max_entries=16)
+def load_forecaster(model_uri: str, train_df: pd.DataFrame, target_col: str) -> Forecaster:
+    """
+    Returns the forecaster of a trained model, shared by all the sessions
+    """
+    return Forecaster().load(
+        model_uri=model_uri,
+        train_df=train_df,
+        target_col=target_col
+    )
+
+
+def select_window(first, last, key: str) -> tuple:
+    """
+    Returns the first and the last (excluded) date of a chart, chosen
+    with a slider; only the points of the window are sent to the browser
+    """
+    first, last = pd.Timestamp(first).date(), pd.Timestamp(last).date()
+    start, end = st.slider(
+        label="Intervallo del grafico",
+        min_value=first,
+        max_value=last,
+        value=(first, last),
+        format="DD/MM/YYYY",
+        key=f"{key}_{first}_{last}"
+    )
+    return pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+
+
+def history_figure(prices: pd.DataFrame, column: str, key: str, **line_kwargs) -> dict:
+    """
+    The line of one column of the prices, downsampled to the window
+    chosen with `select_window`; `line_kwargs` are passed to `px.line`.
+    """
+    start, end = select_window(prices.index.min(), prices.index.max(), key=key)
+    return get_figure_cache().get(
+        ("history", column, data_version(prices[column]), start, end, MAX_POINTS),
+        lambda: px.line(
+            downsample(prices, MAX_POINTS, column=column, start=start, end=end),
+            y=column,
+            **line_kwargs
+        )
+    )
+
+
+def windowed_forecast_figure(history: pd.Series, forecast: pd.DataFrame, ylabel: str, key: str) -> dict:
+    """
+    `forecast_figure` of the history and the forecast downsampled to the
+    window chosen with `select_window`.
+    """
+    start, end = select_window(
+        min(history.index.min(), forecast.index.min()),
+        max(history.index.max(), forecast.index.max()),
+        key=key
+    )
+    return get_figure_cache().get(
+        ("forecast", ylabel, data_version(history, forecast), start, end, MAX_POINTS),
+        lambda: forecast_figure(
+            downsample(history, MAX_POINTS, start=start, end=end),
+            downsample(forecast, MAX_POINTS, column="yhat", start=start, end=end),
+            ylabel=ylabel
+        )
+    )
+
+
+def prediction_figure(forecaster: Forecaster, predictions: pd.DataFrame, ylabel: str) -> dict:
+    """
+    The history a model was trained on, with its predictions.
+    """
+    series = forecaster.series
+    return windowed_forecast_figure(
+        pd.Series(series.y, index=series.ds),
+        predictions.set_index("ds")[["yhat", "yhat_lower", "yhat_upper"]],
+        ylabel=ylabel,
+        key="prediction_window"
+    )
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+
+# the points of a series sent to the browser, see `epm.downsampling`
+MAX_POINTS = 2000
+
+
+def data_version(*data) -> str:
+    """
+    Hash of the series a figure is drawn from, to key `FigureCache`.
+    """
+    digest = hashlib.sha256()
+    for d in data:
+        digest.update(pd.util.hash_pandas_object(d).values.tobytes())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """
+    The figures of the pages serialized to Plotly JSON, shared by every
+    session of a page, so that a rerun neither downsamples the series nor
+    builds the figure again.
+
+    Figures are keyed by what they depend on, typically their kind, the
+    `data_version` of their series, the plotted window and the number of
+    points; only the `max_entries` most recently used are kept.
+    """
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, build) -> dict:
+        """
+        Returns the figure of `key` as a dict that `st.plotly_chart` accepts,
+        calling `build` to make the `go.Figure` when it is not cached.
+        """
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return json.loads(self._figures[key])
+        figure = build().to_json()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return json.loads(figure)
+
+
+def forecast_figure(
+        history: pd.Series,
+        forecast: pd.DataFrame,
+        xlabel: str = "Data",
+        ylabel: str = ""
+    ) -> go.Figure:
+    """
+    Plots observed prices and a forecast with its uncertainty interval in
+    the style of `prophet.plot.plot_plotly`, without needing the model.
+
+    Args
+    ---------
+    `history`: `pd.Series`
+        the observed prices, indexed by date.
+    `forecast`: `pd.DataFrame`
+        indexed by date, with columns `yhat`, `yhat_lower` and `yhat_upper`.
+    """
+    line_color = "#0072B2"
+    band_color = "rgba(0, 114, 178, 0.2)"
+    fig = go.Figure([
+        go.Scatter(
+            name="Actual", x=history.index, y=history.values,
+            mode="markers", marker=dict(color="black", size=4)
+        ),
+        go.Scatter(
+            x=forecast.index, y=forecast["yhat_lower"],
+            mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False
+        ),
+        go.Scatter(
+            name="Predicted", x=forecast.index, y=forecast["yhat"],
+            mode="lines", line=dict(color=line_color, width=2),
+            fill="tonexty", fillcolor=band_color
+        ),
+        go.Scatter(
+            x=forecast.index, y=forecast["yhat_upper"],
+            mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False,
+            fill="tonexty", fillcolor=band_color
+        ),
+    ])
+    fig.update_layout(
+        xaxis_title=xlabel, yaxis_title=ylabel, showlegend=False, height=600
+    )
+    return fig
+
+
+def range_figure(
+        prices: pd.DataFrame,
+        column: str,
+        title: str = "",
+        xlabel: str = "Data",
+        ylabel: str = ""
+    ) -> go.Figure:
+    """
+    Plots the mean price of each period with the band between its minimum
+    and maximum, as returned by `PricePyramid.read`.
+
+    Args
+    ---------
+    `prices`: `pd.DataFrame`
+        indexed by date, with the mean price in `column` and the `min` and
+        `max` columns.
+    """
+    line_color = "#636EFA"
+    band_color = "rgba(99, 110, 250, 0.2)"
+    fig = go.Figure([
+        go.Scatter(
+            x=prices.index, y=prices["min"],
+            mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False
+        ),
+        go.Scatter(
+            x=prices.index, y=prices["max"],
+            mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False,
+            fill="tonexty", fillcolor=band_color
+        ),
+        go.Scatter(
+            name=column, x=prices.index, y=prices[column],
+            mode="lines", line=dict(color=line_color, width=2)
+        ),
+    ])
+    fig.update_layout(
+        title=title, xaxis_title=xlabel, yaxis_title=ylabel, showlegend=False
+    )
+    return fig
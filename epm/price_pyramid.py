@@ -0,0 +1,216 @@
+import glob
+import os
+import pandas as pd
+
+from epm.price_store import PriceStore
+from epm.tracing import span
+
+# the aggregate levels kept up to date, coarsest last; weeks end on Sunday
+# as in the `pun_weekly` dataset, months are labelled by their first day
+LEVELS = {
+    "daily": "D",
+    "weekly": "W",
+    "monthly": "MS",
+}
+
+
+class PricePyramid:
+    """
+    A price series stored at its finest resolution together with its daily,
+    weekly and monthly aggregates, so that coarse views never rescan the
+    raw prices:
+
+        <store root>/pyramid/<name>/raw_2023.arrow
+        <store root>/pyramid/<name>/raw_2024.arrow
+        <store root>/pyramid/<name>/daily.arrow
+        ...
+
+    The raw prices are split in one dataset per (UTC) year, so that
+    appending the prices of an hour only rewrites the file of its year.
+
+    Every level keeps the `sum`, `count`, `min` and `max` of the raw prices
+    of each period; means are computed on read, and any other frequency is
+    resampled on read from the daily level (or from the raw prices, when
+    its periods are shorter than a day).
+
+    Raw timestamps are naive UTC when `tz` is given, so that the repeated
+    hour of the switch from daylight saving time stays unique, while the
+    periods of the aggregates follow the local calendar of `tz`.
+    """
+
+    def __init__(self, store: PriceStore, name: str, column: str = "price", tz: str = None) -> None:
+        """
+        Args
+        ---------
+        `store`: `PriceStore`
+            the pyramid lives in a `pyramid/<name>` folder under its root.
+        `name`: `str`
+            name of the series, e.g. `pun`.
+        `column`: `str`
+            name of the mean column returned by `read`, e.g. `PUN`.
+        `tz`: `str`
+            time zone of the periods, e.g. `Europe/Rome`; `None` for naive timestamps.
+        """
+        self.name = name
+        self.column = column
+        self.tz = tz
+        self.store = PriceStore(os.path.join(store.root, "pyramid", name))
+
+    def exists(self) -> bool:
+        return len(self.raw_years()) > 0
+
+    def version(self) -> int:
+        """
+        Changes whenever prices are appended, to key the views built on the
+        pyramid without reading it.
+        """
+        paths = glob.glob(os.path.join(self.store.root, "*.arrow"))
+        return max((os.stat(path).st_mtime_ns for path in paths), default=0)
+
+    def bounds(self) -> tuple:
+        """
+        Returns the first and the last day with prices, in local time, or
+        `(None, None)` when nothing is stored; only the daily level is opened.
+        """
+        return self.store.first_timestamp("daily"), self.store.last_timestamp("daily")
+
+    def raw_years(self) -> list:
+        """
+        Returns the sorted list of years of the raw prices stored.
+        """
+        paths = glob.glob(os.path.join(self.store.root, "raw_*.arrow"))
+        return sorted(int(os.path.basename(path)[4:-6]) for path in paths)
+
+    @span("pyramid.append")
+    def append(self, prices: pd.Series) -> int:
+        """
+        Upserts raw prices and refreshes the aggregates of the periods they
+        fall in; only the raw prices from the start of the earliest of those
+        periods are read again.
+
+        Args
+        ---------
+        `prices`: `pd.Series`
+            indexed by naive timestamps, in UTC when the pyramid has a `tz`.
+
+        Returns
+        --------
+        `n_rows`: `int`
+            the number of raw prices upserted.
+        """
+        prices = prices.dropna()
+        if len(prices) == 0:
+            return 0
+        prices = prices.astype(float).to_frame(name="price")
+        for year, rows in prices.groupby(prices.index.year):
+            self.store.write(f"raw_{year}", rows)
+
+        # each level refreshes its periods from the one holding the earliest new price
+        first = self._local(pd.DatetimeIndex([prices.index.min()]))[0].normalize()
+        starts = {
+            "daily": first,
+            "weekly": first - pd.Timedelta(days=first.weekday()),
+            "monthly": first.replace(day=1),
+        }
+        raw = self._read_utc(start=self._utc(min(starts.values())) - pd.Timedelta(days=1))
+        raw.index = self._local(raw.index)
+
+        for level, freq in LEVELS.items():
+            self.store.write(level, self._aggregate(raw[raw.index >= starts[level]], freq))
+        return len(prices)
+
+    def read(self, resolution: str = "daily", start=None, end=None) -> pd.DataFrame:
+        """
+        Returns the prices of a time range at a given resolution.
+
+        Args
+        ---------
+        `resolution`: `str`
+            `raw`, one of `LEVELS`, or any pandas frequency, e.g. `12h` or `QS`.
+        `start`, `end`: date-like
+            the range of the periods, in local time, both included.
+
+        Returns
+        --------
+        `prices`: `pd.DataFrame`
+            the mean of each period in the `column` column, then its `min`,
+            `max` and `count`, indexed by naive local timestamps; empty, with
+            the same columns, when nothing is stored.
+        """
+        if not self.exists():
+            return self._means(pd.DataFrame(columns=["sum", "count", "min", "max"], index=pd.DatetimeIndex([])))
+        if resolution == "raw":
+            return self._read_raw(start, end)
+        if resolution in LEVELS:
+            return self._means(self.store.read(resolution, start=start, end=end))
+
+        # resampled from the daily level, or from the raw prices for intraday periods
+        offset = pd.tseries.frequencies.to_offset(resolution)
+        if isinstance(offset, pd.offsets.Tick) and offset < pd.offsets.Day(1):
+            raw = self._read_raw(start, end)
+            periods = self._aggregate(raw[self.column], resolution)
+        else:
+            days = self.store.read("daily", start=start, end=end)
+            periods = days.resample(resolution).agg(
+                {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+            )
+            periods = periods[periods["count"] > 0]
+        return self._means(periods)
+
+    def _read_raw(self, start=None, end=None) -> pd.DataFrame:
+        # a day of margin on both sides covers any UTC offset
+        raw = self._read_utc(
+            start=self._utc(pd.Timestamp(start)) - pd.Timedelta(days=1) if start is not None else None,
+            end=self._utc(pd.Timestamp(end)) + pd.Timedelta(days=1) if end is not None else None,
+        )
+        raw.index = self._local(raw.index)
+        if start is not None:
+            raw = raw[raw.index >= pd.Timestamp(start)]
+        if end is not None:
+            raw = raw[raw.index <= pd.Timestamp(end)]
+        return pd.DataFrame({
+            self.column: raw,
+            "min": raw,
+            "max": raw,
+            "count": pd.Series(1, index=raw.index, dtype="int64"),
+        })
+
+    def _read_utc(self, start=None, end=None) -> pd.Series:
+        """
+        The raw prices between two naive UTC timestamps, reading only the
+        datasets of the years in between.
+        """
+        years = [
+            year for year in self.raw_years()
+            if (start is None or year >= start.year) and (end is None or year <= end.year)
+        ]
+        frames = [self.store.read(f"raw_{year}", start=start, end=end)["price"] for year in years]
+        if len(frames) == 0:
+            return pd.Series(dtype="float64", index=pd.DatetimeIndex([]))
+        return pd.concat(frames, axis=0)
+
+    def _aggregate(self, raw: pd.Series, freq: str) -> pd.DataFrame:
+        periods = raw.resample(freq).agg(["sum", "count", "min", "max"])
+        return periods[periods["count"] > 0]
+
+    def _means(self, periods: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame({
+            self.column: periods["sum"] / periods["count"],
+            "min": periods["min"],
+            "max": periods["max"],
+            "count": periods["count"].astype("int64"),
+        }, index=pd.DatetimeIndex(periods.index))
+
+    def _local(self, index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+        """
+        Naive UTC timestamps to naive local ones; the hour repeated when
+        daylight saving time ends appears twice.
+        """
+        if self.tz is None:
+            return index
+        return index.tz_localize("UTC").tz_convert(self.tz).tz_localize(None)
+
+    def _utc(self, timestamp: pd.Timestamp) -> pd.Timestamp:
+        if self.tz is None:
+            return timestamp
+        return timestamp.tz_localize(self.tz, ambiguous=True, nonexistent="shift_forward").tz_convert("UTC").tz_localize(None)
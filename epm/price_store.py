@@ -0,0 +1,247 @@
+import json
+import os
+import tempfile
+import time
+import pandas as pd
+import pyarrow as pa
+from contextlib import contextmanager
+
+
+class PriceStore:
+    """
+    Columnar on-disk store for the price series scraped by `epm.scraping_utils`.
+
+    Every commodity is one Arrow IPC file partitioned by year (one record
+    batch per year), with the timestamps kept in a typed `ds` column and
+    prices stored as floats:
+
+        <root>/<commodity>.arrow
+
+    Files are memory-mapped on read, so loading a series does not copy it
+    through Python and a time range only touches the yearly batches it needs.
+    Writes to a dataset are serialized by a lock file next to it, so that
+    concurrent upserts from threads or processes never lose each other's rows.
+    """
+
+    def __init__(self, root: str = "data/store", lock_timeout: float = 60) -> None:
+        """
+        Args
+        ---------
+        `root`: `str`
+            the folder of the datasets.
+        `lock_timeout`: `float`
+            seconds after which a write lock is considered abandoned.
+        """
+        self.root = root
+        self.lock_timeout = lock_timeout
+
+    def path(self, commodity: str) -> str:
+        return os.path.join(self.root, f"{commodity}.arrow")
+
+    def exists(self, commodity: str) -> bool:
+        return os.path.exists(self.path(commodity))
+
+    def partitions(self, commodity: str) -> list:
+        """
+        Returns the sorted list of years stored for a commodity.
+        """
+        if not self.exists(commodity):
+            return []
+        with pa.memory_map(self.path(commodity)) as source:
+            schema = pa.ipc.open_file(source).schema
+        return self._years(schema)
+
+    def write(
+            self,
+            commodity: str,
+            df: pd.DataFrame,
+            float_dtype: str = "float64",
+            overwrite: bool = False,
+            meta: dict = None
+        ) -> None:
+        """
+        Upserts a DataFrame with a datetime index into the commodity dataset.
+        Rows whose timestamp is already stored are replaced by the new ones.
+
+        Args
+        ---------
+        `commodity`: `str`
+            name of the dataset, e.g. `fuel`, `pun_weekly`, `gas`.
+        `df`: `pd.DataFrame`
+            the prices to store, indexed by date.
+        `float_dtype`: `str`
+            `float64` or `float32`, the dtype of the stored float columns.
+        `overwrite`: `bool`
+            replace the whole dataset instead of upserting into it.
+        `meta`: `dict`
+            saved inside the dataset file, so that it is replaced together
+            with the rows, see `dataset_meta`; kept as it is when `None`,
+            and saved even without new rows into an existing dataset.
+        """
+        if len(df) == 0 and (meta is None or not self.exists(commodity)):
+            return
+        df = df.copy()
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.index), name="ds")
+        os.makedirs(self.root, exist_ok=True)
+        with self._locked(commodity):
+            if self.exists(commodity) and not overwrite:
+                if meta is None:
+                    meta = self.dataset_meta(commodity)
+                stored = self.read(commodity)
+                stored.index.name = "ds"
+                if len(df) > 0:
+                    df = pd.concat([stored, df], axis=0)
+                    df = df[~df.index.duplicated(keep="last")]
+                else:
+                    df = stored
+            self._write_table(commodity, df.sort_index(), float_dtype, meta)
+
+    def read(
+            self,
+            commodity: str,
+            start=None,
+            end=None,
+            columns: list = None
+        ) -> pd.DataFrame:
+        """
+        Reads a commodity dataset, optionally restricted to a time range
+        and to a subset of columns.
+
+        Returns
+        --------
+        `df`: `pd.DataFrame`
+            the stored prices with a `DatetimeIndex`, empty when nothing is stored.
+        """
+        if not self.exists(commodity):
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([]))
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        with pa.memory_map(self.path(commodity)) as source:
+            reader = pa.ipc.open_file(source)
+            years = self._years(reader.schema)
+            batches = [
+                reader.get_batch(i)
+                for i, year in enumerate(years)
+                if (start is None or year >= start.year)
+                and (end is None or year <= end.year)
+            ]
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+            if columns is not None:
+                table = table.select(["ds"] + [c for c in columns if c != "ds"])
+            df = table.to_pandas().set_index("ds")
+
+        if start is not None:
+            df = df[df.index >= start]
+        if end is not None:
+            df = df[df.index <= end]
+        df.index.name = None
+        return df
+
+    def first_timestamp(self, commodity: str):
+        """
+        Returns the oldest timestamp stored for a commodity, or `None`.
+        """
+        if not self.exists(commodity):
+            return None
+        with pa.memory_map(self.path(commodity)) as source:
+            ds = pa.ipc.open_file(source).get_batch(0).column("ds")
+            return pd.Timestamp(ds[0].as_py())
+
+    def last_timestamp(self, commodity: str):
+        """
+        Returns the most recent timestamp stored for a commodity, or `None`.
+        """
+        if not self.exists(commodity):
+            return None
+        with pa.memory_map(self.path(commodity)) as source:
+            reader = pa.ipc.open_file(source)
+            ds = reader.get_batch(reader.num_record_batches - 1).column("ds")
+            return pd.Timestamp(ds[len(ds) - 1].as_py())
+
+    def dataset_meta(self, commodity: str) -> dict:
+        """
+        Returns the metadata saved inside a commodity dataset by `write`.
+        """
+        if not self.exists(commodity):
+            return {}
+        with pa.memory_map(self.path(commodity)) as source:
+            schema = pa.ipc.open_file(source).schema
+        return json.loads((schema.metadata or {}).get(b"meta", b"{}"))
+
+    def read_meta(self, commodity: str) -> dict:
+        """
+        Returns the metadata saved next to a commodity dataset, e.g. the
+        HTTP validators of its last download.
+        """
+        path = os.path.join(self.root, f"{commodity}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def write_meta(self, commodity: str, meta: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, f"{commodity}.json")
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=f"{commodity}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def import_csv(self, commodity: str, path: str, **kwargs) -> None:
+        """
+        One-off migration of a CSV file indexed by date into the store.
+        """
+        df = pd.read_csv(path, index_col=0, parse_dates=True, **kwargs)
+        self.write(commodity, df)
+
+    def _write_table(self, commodity: str, df: pd.DataFrame, float_dtype: str, meta: dict = None) -> None:
+        for col in df.columns:
+            if pd.api.types.is_float_dtype(df[col]):
+                df[col] = df[col].astype(float_dtype)
+
+        table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+        years = sorted(set(df.index.year))
+        metadata = {"years": ",".join(str(y) for y in years)}
+        if meta:
+            metadata["meta"] = json.dumps(meta, default=str)
+        schema = table.schema.with_metadata(metadata)
+
+        # write aside and swap, so that readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=f"{commodity}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, schema) as writer:
+                    for year in years:
+                        mask = (df.index.year == year)
+                        writer.write_table(table.filter(pa.array(mask)).replace_schema_metadata(None))
+            os.replace(tmp_path, self.path(commodity))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _locked(self, commodity: str):
+        path = self.path(commodity) + ".lock"
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                # a process that died while writing leaves its lock behind
+                try:
+                    if time.time() - os.path.getmtime(path) > self.lock_timeout:
+                        os.remove(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.remove(path)
+
+    def _years(self, schema: pa.Schema) -> list:
+        years = (schema.metadata or {}).get(b"years", b"").decode()
+        return [int(y) for y in years.split(",") if y]
@@ -0,0 +1,192 @@
+import datetime
+import os
+import threading
+import time
+import pandas as pd
+
+from epm.price_store import PriceStore
+from epm.scraping_utils.http_client import HttpClient
+from epm.tracing import span
+
+# how long the data of each source are considered fresh, following how
+# often they are published: weekly fuel prices, daily PUN, intraday TTF
+DEFAULT_TTLS = {
+    "fuel": datetime.timedelta(days=7),
+    "pun": datetime.timedelta(days=1),
+    "gas": datetime.timedelta(hours=1),
+    "gas_daily": datetime.timedelta(hours=1),
+}
+
+
+class PriceCache:
+    """
+    TTL-aware cache of the price series, persisted on disk through the
+    price store and therefore shared by every Streamlit session, process
+    and restart.
+
+    Stale data are served straight away while a background thread refreshes
+    them (stale-while-revalidate); only a source that was never fetched is
+    refreshed synchronously. A lock file next to the store makes sure that
+    a single process refreshes a given source at a time, and after a failed
+    refresh no other is attempted for a backoff doubling at every failure.
+    """
+
+    def __init__(
+            self,
+            store: PriceStore = None,
+            sources: dict = None,
+            ttls: dict = None,
+            lock_timeout: float = 600,
+            retry_after: float = 300
+        ) -> None:
+        """
+        Args
+        ---------
+        `store`: `PriceStore`
+            where prices and refresh times are persisted.
+        `sources`: `dict`
+            maps every source name to an `(update, read)` pair of callables,
+            defaults to the fuel, PUN and gas scrapers.
+        `ttls`: `dict`
+            maps every source name to a `datetime.timedelta`.
+        `lock_timeout`: `float`
+            seconds after which a refresh lock is considered abandoned.
+        `retry_after`: `float`
+            seconds before retrying a failed refresh, doubled at every
+            consecutive failure up to the source TTL.
+        """
+        self.store = store if store is not None else PriceStore()
+        self.sources = sources if sources is not None else self.default_sources()
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.lock_timeout = lock_timeout
+        self.retry_after = retry_after
+
+    def default_sources(self) -> dict:
+        # imported here, so that sources with a failing optional dependency
+        # (e.g. yfinance) do not prevent the others from being cached
+        from epm.scraping_utils.elec_prices import ElectricityPrices
+        from epm.scraping_utils.fuel_prices import FuelPrices
+        from epm.scraping_utils.gas_prices import GasPrices
+
+        client = HttpClient()
+        fp = FuelPrices(store=self.store, client=client)
+        ep = ElectricityPrices(store=self.store, client=client)
+        return {
+            "fuel": (fp.update, fp.read_data),
+            "pun": (ep.ingest, ep.read_data),
+            "gas": (
+                lambda: GasPrices.update(self.store, session=client.session),
+                lambda: GasPrices.read_data(self.store),
+            ),
+            "gas_daily": (
+                lambda: GasPrices.update(self.store, session=client.session, interval="1d"),
+                lambda: GasPrices.read_data(self.store, interval="1d"),
+            ),
+        }
+
+    def get(self, source: str) -> pd.DataFrame:
+        """
+        Returns the last good data of a source, scheduling a background
+        refresh when they are older than the source TTL.
+        """
+        update, read = self.sources[source]
+        refreshed_at = self.refreshed_at(source)
+
+        if refreshed_at is None:
+            if not self.refresh(source):
+                # another process is fetching this source for the first time
+                self._wait(source)
+        elif datetime.datetime.now() - refreshed_at > self.ttls[source] and not self.backing_off(source):
+            threading.Thread(
+                target=self.refresh, args=(source,), daemon=True
+            ).start()
+
+        return read()
+
+    def refreshed_at(self, source: str):
+        refreshed_at = self.store.read_meta(f"{source}.cache").get("refreshed_at")
+        if refreshed_at is None:
+            return None
+        return datetime.datetime.fromisoformat(refreshed_at)
+
+    def backing_off(self, source: str) -> bool:
+        """
+        Whether the last refresh of a source failed less than its backoff ago.
+        """
+        meta = self.store.read_meta(f"{source}.cache")
+        if meta.get("failed_at") is None:
+            return False
+        backoff = min(
+            datetime.timedelta(seconds=self.retry_after * 2 ** (meta["failures"] - 1)),
+            self.ttls[source]
+        )
+        return datetime.datetime.now() - datetime.datetime.fromisoformat(meta["failed_at"]) < backoff
+
+    def refresh(self, source: str) -> bool:
+        """
+        Runs the update of a source unless another thread or process is
+        already doing it.
+
+        Returns
+        --------
+        `refreshed`: `bool`
+            whether this call actually refreshed the source.
+        """
+        if not self._acquire(source):
+            return False
+        try:
+            update, _ = self.sources[source]
+            with span("cache.refresh", source=source):
+                update()
+            self.store.write_meta(
+                f"{source}.cache",
+                {"refreshed_at": datetime.datetime.now().isoformat()}
+            )
+        except Exception as e:
+            print(f"Failed to refresh {source}: {e}")
+            meta = self.store.read_meta(f"{source}.cache")
+            meta["failures"] = meta.get("failures", 0) + 1
+            meta["failed_at"] = datetime.datetime.now().isoformat()
+            self.store.write_meta(f"{source}.cache", meta)
+            if self.refreshed_at(source) is None:
+                raise
+            return False
+        finally:
+            self._release(source)
+        return True
+
+    def _lock_path(self, source: str) -> str:
+        return os.path.join(self.store.root, f"{source}.lock")
+
+    def _acquire(self, source: str) -> bool:
+        os.makedirs(self.store.root, exist_ok=True)
+        path = self._lock_path(source)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            # a process that died while refreshing leaves its lock behind
+            try:
+                if time.time() - os.path.getmtime(path) > self.lock_timeout:
+                    os.remove(path)
+                    return self._acquire(source)
+            except FileNotFoundError:
+                # released since the lock was found
+                return self._acquire(source)
+            return False
+
+    def _wait(self, source: str) -> None:
+        path = self._lock_path(source)
+        while True:
+            try:
+                if time.time() - os.path.getmtime(path) > self.lock_timeout:
+                    return
+            except FileNotFoundError:
+                return
+            time.sleep(0.5)
+
+    def _release(self, source: str) -> None:
+        try:
+            os.remove(self._lock_path(source))
+        except FileNotFoundError:
+            pass
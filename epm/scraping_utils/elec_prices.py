@@ -1,65 +1,250 @@
+import hashlib
+import json
+import os
 import pandas as pd
-import requests
-from io import BytesIO
-from zipfile import ZipFile
-from urllib.request import urlopen
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from epm.price_pyramid import PricePyramid
+from epm.price_store import PriceStore
+from epm.scraping_utils.http_client import HttpClient
+from epm.scraping_utils.pun_aggregation import (
+    aggregate_archives,
+    aggregate_url,
+    merge_intervals,
+    GME_TZ,
+)
+from epm.tracing import span
 
 
 class ElectricityPrices:
-    def __init__(self):
-        # net of VAT average fuel prices in Italy
-        self.zip_url = (
-            "https://www.mercatoelettrico.org/it/MenuBiblioteca/Documenti/Anno2023.zip"
-        )
+    def __init__(
+            self,
+            year: int = 2023,
+            base_url: str = "https://www.mercatoelettrico.org/it/MenuBiblioteca/Documenti",
+            data_dir: str = "data",
+            store: PriceStore = None,
+            client: HttpClient = None
+        ):
+        # hourly PUN prices published by GME, one zip archive per year
+        self.base_url = base_url
+        self.zip_url = self.archive_url(year)
+        self.data_dir = data_dir
+        # weekly running sums and counts of the hourly prices ingested so far
+        self.store = store if store is not None else PriceStore(os.path.join(data_dir, "store"))
+        # hourly prices with their daily, weekly and monthly aggregates
+        self.pyramid = PricePyramid(self.store, "pun", column="PUN", tz=GME_TZ)
+        self.client = client if client is not None else HttpClient()
+        # watermarks saved before they were kept inside the weekly dataset
+        self.watermark_path = os.path.join(data_dir, "pun_watermark.json")
+
+    def archive_url(self, year: int) -> str:
+        return f"{self.base_url}/Anno{year}.zip"
 
     def get_data(self) -> pd.DataFrame:
         """
         Fetches historical weekly data and joins them with
         the current year's weekly prices
         """
+        self.ingest()
+        self.df = self.read_data()
+
+        return self.df
+
+    def read_data(self) -> pd.DataFrame:
+        """
+        Joins historical and current weekly prices as they are in the
+        store, without fetching anything.
+        """
         hist_df = self.get_hist_data()
-        new_data = self.get_new_data()
-        # checking last date in history is not the same as the first in the new data
-        if hist_df.iloc[-1].name == new_data.iloc[0].name:
-            hist_df = hist_df[:-1]
-            pun_prices = pd.concat([hist_df, new_data], axis=0)
-        else:
-            pun_prices = pd.concat([hist_df, new_data], axis=0)
+        new_data = self.read_store()
+        # weeks aggregated from the GME archives take precedence over the history
+        pun_prices = new_data.combine_first(hist_df)
 
         pun_prices.index = pd.to_datetime(pun_prices.index)
-        pun_prices.index = pun_prices.index.date
 
-        self.df = pun_prices
-        
-        return self.df
+        return pun_prices
 
     def get_hist_data(self):
-        hist_df = pd.read_csv(
-            "data/hist_pun.csv",
-            index_col=0,
-            parse_dates=True,
-        )
+        """
+        Weekly prices from the hand-made `hist_pun.csv`, when available;
+        `backfill` rebuilds the same weeks from the GME archives.
+        """
+        hist_path = os.path.join(self.data_dir, "hist_pun.csv")
+        # the hand-made history is migrated into the price store on first use
+        if not self.store.exists("pun_hist") and os.path.exists(hist_path):
+            self.store.import_csv("pun_hist", hist_path)
+        hist_df = self.store.read("pun_hist")
 
         return hist_df
 
-    def get_new_data(self):
+    def get_new_data(self) -> pd.DataFrame:
         """
         GME publish one xslx file per year, containing hourly prices.
-        However, what we want is to have weekly prices for the current year
-        """
-        # year 2023
-        resp = urlopen(self.zip_url)
-        myzip = ZipFile(BytesIO(resp.read()))
-        df = pd.read_excel(myzip.open(myzip.namelist()[0]), sheet_name=1)
-        df = df.iloc[:, :3]
-        df.columns = ["Date", "Hour", "PUN"]
-        df["Date"] = df["Date"].astype(str)
-        df["Date"] = pd.to_datetime(df["Date"])
-        df["Hour"] = pd.to_datetime(df["Hour"], unit="h").dt.strftime("%H:%M")
-        df["DateTime"] = pd.to_datetime(
-            df["Date"].astype(str) + " " + df["Hour"].astype(str)
+        However, what we want is to have weekly prices for the current year.
+
+        Ingestion is incremental: only the hours not yet covered by the
+        watermark are aggregated and appended to the weekly store, and the archive is
+        not parsed at all when upstream has not changed since the last run.
+        """
+        self.ingest()
+        return self.read_store()
+
+    @span("pun.ingest")
+    def ingest(self) -> int:
+        """
+        Appends to the weekly store, and to the price pyramid, the hourly
+        prices of the current year archive that were not ingested yet.
+
+        The archive is requested conditionally (`If-None-Match` /
+        `If-Modified-Since`) and its content hash is compared with the one
+        of the last ingested archive, so that an unchanged upstream file
+        is neither downloaded again (when the server supports it) nor parsed.
+
+        Returns
+        --------
+        `n_rows`: `int`
+            the number of new hourly rows ingested, 0 if nothing changed.
+        """
+        watermark = self.read_watermark()
+        content, validators = self.download(watermark)
+        if content is None:
+            return 0
+
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == watermark.get("sha256"):
+            watermark.update(validators)
+            self.write_watermark(watermark)
+            return 0
+
+        # keys are yyyymmddhh integers, so hours 24 and 25 (DST) sort correctly
+        aggregator = aggregate_archives([content], covered=watermark.get("covered"))
+
+        if aggregator.min_key is not None:
+            self.extend_coverage(watermark, [[aggregator.min_key, aggregator.max_key]])
+        watermark.update(validators)
+        watermark["sha256"] = digest
+
+        if aggregator.n_rows > 0:
+            self.pyramid.append(aggregator.to_hours())
+            self.append_store(aggregator.to_frame(), watermark)
+        else:
+            self.write_watermark(watermark)
+
+        return aggregator.n_rows
+
+    @span("pun.backfill")
+    def backfill(self, start_year: int, end_year: int, max_workers: int = None) -> int:
+        """
+        Fetches and aggregates the GME archives of a range of years in a
+        process pool, then merges them into the weekly store.
+
+        Weeks shared by two archives (across new year) or already partly in
+        the store are summed hour by hour: the hours already ingested are
+        skipped by the workers, so re-running a backfill is a no-op.
+
+        Args
+        ---------
+        `start_year`: `int`
+            first year to backfill.
+        `end_year`: `int`
+            last year to backfill, included.
+        `max_workers`: `int`
+            size of the process pool, defaults to the number of CPUs.
+
+        Returns
+        --------
+        `n_rows`: `int`
+            the number of new hourly rows ingested.
+        """
+        watermark = self.read_watermark()
+        covered = watermark.get("covered", [])
+        urls = [self.archive_url(year) for year in range(start_year, end_year + 1)]
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(aggregate_url, urls, repeat(covered)))
+
+        frames = [weeks for weeks, _, _ in results if len(weeks) > 0]
+        self.extend_coverage(
+            watermark, [key_range for _, _, key_range in results if key_range is not None]
+        )
+        if len(frames) > 0:
+            self.pyramid.append(pd.concat([hours for _, hours, _ in results], axis=0))
+            self.append_store(pd.concat(frames, axis=0).groupby(level=0).sum(), watermark)
+        else:
+            self.write_watermark(watermark)
+
+        return int(sum(weeks["count"].sum() for weeks in frames))
+
+    def extend_coverage(self, watermark: dict, key_ranges: list) -> None:
+        """
+        Adds the yyyymmddhh key ranges just ingested to the watermark.
+        """
+        watermark["covered"] = merge_intervals(watermark.get("covered", []) + key_ranges)
+        if len(watermark["covered"]) > 0:
+            watermark["last_key"] = watermark["covered"][-1][1]
+
+    def download(self, watermark: dict):
+        """
+        Downloads the yearly archive, unless the server answers that it has
+        not been modified since the validators stored in the watermark.
+
+        Returns
+        --------
+        `content`: `bytes` or `None`
+            the archive content, `None` when the server replied 304.
+        `validators`: `dict`
+            the `etag` and `last_modified` headers of the response.
+        """
+        return self.client.get(
+            self.zip_url,
+            {k: watermark.get(k) for k in ("etag", "last_modified")}
+        )
+
+    @span("pun.append_store")
+    def append_store(self, weeks: pd.DataFrame, watermark: dict = None) -> None:
+        """
+        Merges weekly sums and counts into the store; a week that was only
+        partially ingested before gets its new hours added.
+
+        The `watermark` covering the new hours is saved in the same write,
+        so that a crash can never leave hours summed but not covered, and
+        summed again by the next run. Hours go to the pyramid before, as
+        appending them again there only replaces them.
+        """
+        stored = self.store.read(
+            "pun_weekly", start=weeks.index.min(), end=weeks.index.max()
         )
-        df.set_index(df["DateTime"], inplace=True, drop=True)
-        df = df["PUN"]
-        df = pd.DataFrame(df.resample("W").mean())
-        return df
+        if len(stored) > 0:
+            weeks = stored[["sum", "count"]].add(weeks, fill_value=0)
+
+        weeks["count"] = weeks["count"].astype("int64")
+        weeks["PUN"] = weeks["sum"] / weeks["count"]
+        self.store.write("pun_weekly", weeks, meta=watermark)
+
+    def read_store(self) -> pd.DataFrame:
+        return self.store.read("pun_weekly", columns=["PUN"])
+
+    def read_resolution(self, resolution: str = "daily", start=None, end=None) -> pd.DataFrame:
+        """
+        The ingested PUN prices at any resolution, see `PricePyramid.read`;
+        only the hours ingested since the pyramid was introduced are there.
+        """
+        return self.pyramid.read(resolution, start=start, end=end)
+
+    def read_watermark(self) -> dict:
+        """
+        The hours already ingested and the validators of the last downloaded
+        archive, saved inside the weekly dataset.
+        """
+        watermark = self.store.dataset_meta("pun_weekly")
+        if len(watermark) == 0 and os.path.exists(self.watermark_path):
+            with open(self.watermark_path) as f:
+                return json.load(f)
+        return watermark
+
+    def write_watermark(self, watermark: dict) -> None:
+        """
+        Saves the watermark without new weeks, see `append_store`.
+        """
+        self.store.write("pun_weekly", pd.DataFrame(), meta=watermark)
@@ -1,5 +1,10 @@
 import pandas as pd
 import requests
+from io import BytesIO
+
+from epm.price_store import PriceStore
+from epm.scraping_utils.http_client import HttpClient
+from epm.tracing import span
 
 
 class FuelPrices:
@@ -10,29 +15,49 @@ class FuelPrices:
     * nlg
     """
 
-    def __init__(self):
+    def __init__(self, store: PriceStore = None, client: HttpClient = None):
         # net of VAT average fuel prices in Italy
         self.url = "https://dgsaie.mise.gov.it/open_data_export.php?export-id=1&amp;export-type=csv"
+        self.store = store if store is not None else PriceStore()
+        self.client = client if client is not None else HttpClient()
+        self.commodity = "fuel"
 
     def get_data(self) -> pd.DataFrame:
-        # Send a GET request to the URL
-        response = requests.get(self.url)
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Save the response content to a file
-            with open(
-                "fuel_prices.csv", "wb"
-            ) as f:
-                f.write(response.content)
-            print("CSV file downloaded successfully.")
-        else:
+        self.update()
+        self.df = self.read_data()
+        return self.df
+
+    def read_data(self) -> pd.DataFrame:
+        return self.store.read(self.commodity)
+
+    @span("fuel.update")
+    def update(self) -> None:
+        """
+        Downloads the weekly fuel prices and upserts them into the price store.
+        The download is skipped when the file has not changed since the last one.
+        """
+        meta = self.store.read_meta(self.commodity)
+        try:
+            content, validators = self.client.get(self.url, meta.get("validators"))
+        except requests.RequestException:
             print("Failed to download CSV file.")
+            return
+        if content is None:
+            print("CSV file not modified since the last download.")
+            return
+        print("CSV file downloaded successfully.")
+
+        self.store.write(self.commodity, self.parse(content))
+        meta["validators"] = validators
+        self.store.write_meta(self.commodity, meta)
+
+    @span("fuel.parse")
+    def parse(self, content: bytes) -> pd.DataFrame:
         fuel_prices = pd.read_csv(
-            "fuel_prices.csv", index_col=0
+            BytesIO(content), index_col=0, parse_dates=True
         )
         fuel_prices = fuel_prices.iloc[:, 0:3]
         fuel_prices = fuel_prices.rename(columns={"GASOLIO_AUTO": "DIESEL"})
         # 1€ per liter
         fuel_prices = fuel_prices.div(1000)
-        self.df = fuel_prices
-        return self.df
+        return fuel_prices
@@ -1,31 +1,86 @@
 import pandas as pd
-import yfinance as yf
+
+from epm.price_pyramid import PricePyramid
+from epm.price_store import PriceStore
+from epm.scraping_utils.gas_sources import INTERVALS, GasSource, default_source
+from epm.tracing import span
+
+# first date of the history, fetched when nothing is stored yet
+HISTORY_START = "2005-01-01"
 
 
 class GasPrices:
     """
-    Makes use of the yfinance python module
-    to scrape natural gas prices from the TTF market.
+    Natural gas prices of the TTF market, weekly or daily, scraped from a
+    `GasSource` (Yahoo Finance by default).
     """
 
     # def __init__(self) -> None:
     #     pass
 
-    def get_data() -> pd.DataFrame:
-        symbol = "TTF=F"
-        ticker = yf.Ticker(symbol)
-        gas_prices = ticker.history(
-            interval="1wk",
-            start="2005-01-01",
-            end=None,
-            actions=True,
-            auto_adjust=True,
-            back_adjust=False,
-        )
-
-        gas_prices.index = pd.to_datetime(gas_prices.index)
-        gas_prices.index = gas_prices.index.date
-        gas_prices = gas_prices[["Close"]]
-        gas_prices = gas_prices.rename(columns={"Close": "GAS NATURALE"})
-
-        return gas_prices
+    @staticmethod
+    def dataset(interval: str = "1wk") -> str:
+        """
+        The name of the price store dataset of the prices with a given interval.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+        return "gas" if interval == "1wk" else "gas_daily"
+
+    @staticmethod
+    def get_data(store: PriceStore = None, session=None, source: GasSource = None, interval: str = "1wk") -> pd.DataFrame:
+        store = store if store is not None else PriceStore()
+        GasPrices.update(store, session=session, source=source, interval=interval)
+        return GasPrices.read_data(store, interval=interval)
+
+    @staticmethod
+    def read_data(store: PriceStore = None, interval: str = "1wk") -> pd.DataFrame:
+        store = store if store is not None else PriceStore()
+        return store.read(GasPrices.dataset(interval))
+
+    @staticmethod
+    @span("gas.update")
+    def update(store: PriceStore = None, session=None, source: GasSource = None, interval: str = "1wk") -> int:
+        """
+        Downloads the TTF prices missing from the price store and upserts them.
+
+        Only the bars from the last stored one onwards are requested: the
+        last bar is fetched again, as the bar of the current week (or day)
+        keeps changing until it closes.
+
+        Args
+        ---------
+        `session`: `requests.Session`
+            shares its connection pool with the default source.
+        `source`: `GasSource`
+            where the prices come from, see `default_source`.
+        `interval`: `str`
+            `1wk` or `1d`, stored in the `gas` and `gas_daily` datasets; daily
+            closes also feed the weekly and monthly levels of the `gas` pyramid.
+
+        Returns
+        --------
+        `n_rows`: `int`
+            the number of bars downloaded.
+        """
+        store = store if store is not None else PriceStore()
+        source = source if source is not None else default_source(session)
+        dataset = GasPrices.dataset(interval)
+
+        last = store.last_timestamp(dataset)
+        start = last if last is not None else HISTORY_START
+        closes = source.history(start=start, interval=interval).dropna()
+
+        gas_prices = closes.to_frame(name="GAS NATURALE")
+        store.write(dataset, gas_prices)
+        if interval == "1d":
+            GasPrices.pyramid(store).append(closes)
+        return len(gas_prices)
+
+    @staticmethod
+    def pyramid(store: PriceStore = None) -> PricePyramid:
+        """
+        The daily closes with their weekly and monthly aggregates.
+        """
+        store = store if store is not None else PriceStore()
+        return PricePyramid(store, "gas", column="GAS NATURALE")
@@ -0,0 +1,95 @@
+import os
+import pandas as pd
+
+# bar sizes of the gas prices, as named by yfinance
+INTERVALS = ("1d", "1wk")
+
+
+class GasSource:
+    """
+    Where the TTF closing prices come from. `GasPrices` only asks a source
+    for the bars of a date range, so Yahoo Finance can be replaced by a
+    local file in tests and offline deployments (see `default_source`).
+    """
+
+    def history(self, start, end=None, interval: str = "1wk") -> pd.Series:
+        """
+        Returns the closing prices of the bars from `start` to `end` included
+        (today when `None`).
+
+        Args
+        ---------
+        `start`, `end`: date-like
+            the range of the bars.
+        `interval`: `str`
+            `1d` or `1wk`; weekly bars are dated on the Monday starting the week.
+
+        Returns
+        --------
+        `closes`: `pd.Series`
+            indexed by naive dates.
+        """
+        raise NotImplementedError
+
+
+class YahooFinanceSource(GasSource):
+    """
+    The TTF front-month future on Yahoo Finance.
+    """
+
+    def __init__(self, symbol: str = "TTF=F", session=None) -> None:
+        """
+        Args
+        ---------
+        `session`: `requests.Session`
+            shares the connection pool of the other scrapers.
+        """
+        self.symbol = symbol
+        self.session = session
+
+    def history(self, start, end=None, interval: str = "1wk") -> pd.Series:
+        # imported here, so that reading the stored prices does not load yfinance
+        import yfinance as yf
+
+        ticker = yf.Ticker(self.symbol, session=self.session)
+        bars = ticker.history(
+            interval=interval,
+            start=pd.Timestamp(start).strftime("%Y-%m-%d"),
+            # yfinance excludes the end date
+            end=(pd.Timestamp(end) + pd.Timedelta(days=1)).strftime("%Y-%m-%d") if end is not None else None,
+            actions=True,
+            auto_adjust=True,
+            back_adjust=False,
+        )
+        # stored as naive dates, like the other commodities
+        return pd.Series(bars["Close"].values, index=pd.to_datetime(bars.index.date))
+
+
+class CsvSource(GasSource):
+    """
+    Daily closing prices from a local CSV file, with the dates in the first
+    column and the prices in a `Close` column; weekly bars are built from
+    them as Yahoo Finance does, with the last close of the week.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def history(self, start, end=None, interval: str = "1wk") -> pd.Series:
+        closes = pd.read_csv(self.path, index_col=0, parse_dates=True)["Close"].sort_index()
+        if interval == "1wk":
+            closes = closes.resample("W-MON", label="left", closed="left").last().dropna()
+        closes = closes[closes.index >= pd.Timestamp(start)]
+        if end is not None:
+            closes = closes[closes.index <= pd.Timestamp(end)]
+        return closes
+
+
+def default_source(session=None) -> GasSource:
+    """
+    Yahoo Finance, unless `EPM_GAS_CSV` points to a local file of prices.
+    """
+    path = os.environ.get("EPM_GAS_CSV")
+    if path:
+        return CsvSource(path)
+    return YahooFinanceSource(session=session)
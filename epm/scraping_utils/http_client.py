@@ -0,0 +1,106 @@
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from urllib3.util.retry import Retry
+
+from epm.tracing import span
+
+
+class FileAdapter(BaseAdapter):
+    """
+    Answers `file://` URLs from the local disk, so that the scrapers can
+    read local copies of the published files, e.g. the GME archives.
+    """
+
+    def send(self, request, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        try:
+            with open(url2pathname(urlparse(request.url).path), "rb") as f:
+                response._content = f.read()
+            response.status_code, response.reason = 200, "OK"
+        except FileNotFoundError:
+            response._content = b""
+            response.status_code, response.reason = 404, "Not Found"
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class HttpClient:
+    """
+    HTTP client shared by the scrapers: a single `requests.Session` with
+    pooled keep-alive connections, timeouts, retries with exponential
+    backoff and conditional requests. `file://` URLs are read from disk.
+    """
+
+    def __init__(
+            self,
+            pool_size: int = 10,
+            timeout: float = 30,
+            retries: int = 3,
+            backoff_factor: float = 0.5
+        ) -> None:
+        """
+        Args
+        ---------
+        `pool_size`: `int`
+            number of connections kept alive per host.
+        `timeout`: `float`
+            connect and read timeout of every request, in seconds.
+        `retries`: `int`
+            attempts made on connection errors and 429/5xx responses.
+        `backoff_factor`: `float`
+            retries wait `backoff_factor * 2 ** (attempt - 1)` seconds.
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.mount("file://", FileAdapter())
+
+    def get(self, url: str, validators: dict = None):
+        """
+        Downloads a resource, unless the server answers that it has not
+        been modified since the `validators` of a previous response.
+
+        Returns
+        --------
+        `content`: `bytes` or `None`
+            the response body, `None` when the server replied 304.
+        `validators`: `dict`
+            the `etag` and `last_modified` headers of the response.
+        """
+        validators = validators or {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        with span("http.get", url=url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None, validators
+        response.raise_for_status()
+
+        return response.content, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def close(self) -> None:
+        self.session.close()
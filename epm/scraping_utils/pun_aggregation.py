@@ -0,0 +1,199 @@
+import datetime
+import pandas as pd
+from io import BytesIO
+from itertools import islice
+from zipfile import ZipFile
+
+from epm.scraping_utils.http_client import HttpClient
+from epm.tracing import span
+
+# GME dates and hours (1 to 24, 23 or 25 on daylight saving days) are Italian time
+GME_TZ = "Europe/Rome"
+
+
+def read_chunks(content: bytes, chunk_size: int = 10000, sheet_index: int = 1):
+    """
+    Streams the hourly prices out of a GME yearly archive.
+
+    The xlsx inside the zip is opened in read-only mode, so rows are
+    decoded lazily and never held all together in memory.
+
+    Args
+    ---------
+    `content`: `bytes`
+        the zip archive published by GME.
+    `chunk_size`: `int`
+        number of rows yielded at a time.
+    `sheet_index`: `int`
+        the sheet holding the prices (date, hour, PUN in the first three columns).
+
+    Yields
+    --------
+    `chunk`: `list`
+        of `(date, hour, pun)` tuples, with `date` as a yyyymmdd integer.
+    """
+    # imported here, so that reading the stored prices does not load openpyxl
+    from openpyxl import load_workbook
+
+    myzip = ZipFile(BytesIO(content))
+    with myzip.open(myzip.namelist()[0]) as xlsx:
+        wb = load_workbook(xlsx, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[sheet_index].iter_rows(
+                min_row=2, max_col=3, values_only=True
+            )
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            wb.close()
+
+
+class WeeklyAggregator:
+    """
+    Running weekly sums and counts of hourly PUN prices.
+
+    Weeks end on Sunday, as in `resample("W")`, and are computed from the
+    yyyymmdd date integers without building any timestamp column. Feeding
+    several yearly archives into the same aggregator backfills them in one pass.
+
+    Hours are identified by their yyyymmddhh key; the keys falling in one of
+    the `covered` intervals are already in the store and are skipped, so
+    that sums can be added to the stored ones without counting an hour twice.
+    The prices of the hours not covered are kept too, see `to_hours`.
+    """
+
+    def __init__(self, covered: list = None) -> None:
+        self.covered = [tuple(interval) for interval in (covered or [])]
+        # key range of all the rows read, skipped ones included
+        self.min_key = None
+        self.max_key = None
+        self.n_rows = 0
+        self.sums = {}
+        self.counts = {}
+        self.hours = []
+        self._week_end = {}
+
+    def is_covered(self, key: int) -> bool:
+        for first, last in self.covered:
+            if first <= key <= last:
+                return True
+        return False
+
+    def week_end(self, date: int) -> int:
+        """
+        Returns the proleptic ordinal of the Sunday closing the week of a yyyymmdd date.
+        """
+        if date not in self._week_end:
+            day = datetime.date(date // 10000, date // 100 % 100, date % 100)
+            self._week_end[date] = day.toordinal() + 6 - day.weekday()
+        return self._week_end[date]
+
+    def update(self, chunk: list) -> None:
+        sums, counts = self.sums, self.counts
+        for date, hour, pun in chunk:
+            if date is None or hour is None or pun is None:
+                continue
+            date = int(date)
+            key = date * 100 + int(hour)
+            if self.min_key is None or key < self.min_key:
+                self.min_key = key
+            if self.max_key is None or key > self.max_key:
+                self.max_key = key
+            if self.is_covered(key):
+                continue
+            week = self.week_end(date)
+            sums[week] = sums.get(week, 0.0) + float(pun)
+            counts[week] = counts.get(week, 0) + 1
+            self.hours.append((key, float(pun)))
+            self.n_rows += 1
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns
+        --------
+        `weeks`: `pd.DataFrame`
+            `sum` and `count` of the hourly prices, indexed by week-ending Sunday.
+        """
+        weeks = sorted(self.sums)
+        return pd.DataFrame(
+            {
+                "sum": [self.sums[w] for w in weeks],
+                "count": [self.counts[w] for w in weeks],
+            },
+            index=pd.DatetimeIndex(
+                [datetime.date.fromordinal(w) for w in weeks], name="Date"
+            ),
+        )
+
+
+    def to_hours(self) -> pd.Series:
+        """
+        Returns
+        --------
+        `hours`: `pd.Series`
+            the hourly prices not covered, indexed by the naive UTC start of
+            each hour, so that the hour repeated in October stays unique.
+        """
+        keys = pd.Series([key for key, _ in self.hours], dtype="int64")
+        midnight = pd.to_datetime(keys // 100, format="%Y%m%d").dt.tz_localize(GME_TZ)
+        starts = midnight.dt.tz_convert("UTC").dt.tz_localize(None) + pd.to_timedelta(keys % 100 - 1, unit="h")
+        return pd.Series(
+            [pun for _, pun in self.hours], index=pd.DatetimeIndex(starts, name="Date"), dtype="float64"
+        ).sort_index()
+
+
+@span("pun.parse_xlsx")
+def aggregate_archives(archives, covered: list = None, chunk_size: int = 10000) -> WeeklyAggregator:
+    """
+    Aggregates one or more GME yearly archives (as bytes) into weekly
+    sums and counts, streaming each of them in chunks.
+    """
+    aggregator = WeeklyAggregator(covered=covered)
+    for content in archives:
+        for chunk in read_chunks(content, chunk_size=chunk_size):
+            aggregator.update(chunk)
+    return aggregator
+
+
+def aggregate_url(url: str, covered: list = None, chunk_size: int = 10000, timeout: float = 60):
+    """
+    Downloads and aggregates a single GME yearly archive; meant to be run
+    in a worker process, as the xlsx decoding is CPU bound. The download is
+    retried on connection errors and 429/5xx responses, see `HttpClient`.
+
+    Returns
+    --------
+    `weeks`: `pd.DataFrame`
+        weekly `sum` and `count` of the hours not already covered.
+    `hours`: `pd.Series`
+        the prices of those hours, see `WeeklyAggregator.to_hours`.
+    `key_range`: `list`
+        the `[first, last]` yyyymmddhh keys found in the archive, `None` if empty.
+    """
+    # a client per call, as sessions cannot be shared with the worker processes
+    client = HttpClient(pool_size=1, timeout=timeout)
+    try:
+        content, _ = client.get(url)
+    finally:
+        client.close()
+    aggregator = aggregate_archives([content], covered=covered, chunk_size=chunk_size)
+    key_range = None
+    if aggregator.min_key is not None:
+        key_range = [aggregator.min_key, aggregator.max_key]
+    return aggregator.to_frame(), aggregator.to_hours(), key_range
+
+
+def merge_intervals(intervals: list) -> list:
+    """
+    Merges overlapping `[first, last]` key intervals.
+    """
+    merged = []
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
@@ -0,0 +1,32 @@
+import argparse
+
+from epm.scraping_utils.elec_prices import ElectricityPrices
+
+
+def main() -> None:
+    """
+    Backfills the weekly PUN store from the GME yearly archives, e.g.
+
+        python -m epm.scraping_utils.pun_backfill 2004 2023
+
+    `--base-url` also accepts `file://` URLs, to backfill from local archives.
+    """
+    parser = argparse.ArgumentParser(description="Backfill weekly PUN prices from GME archives")
+    parser.add_argument("start_year", type=int)
+    parser.add_argument("end_year", type=int)
+    parser.add_argument(
+        "--base-url",
+        default="https://www.mercatoelettrico.org/it/MenuBiblioteca/Documenti",
+        help="where the AnnoYYYY.zip archives are published",
+    )
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    ep = ElectricityPrices(base_url=args.base_url, data_dir=args.data_dir)
+    n_rows = ep.backfill(args.start_year, args.end_year, max_workers=args.workers)
+    print(f"Ingested {n_rows} hourly prices from {args.start_year} to {args.end_year}.")
+
+
+if __name__ == "__main__":
+    main()
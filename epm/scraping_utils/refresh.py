@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from epm.price_store import PriceStore
+from epm.scraping_utils.elec_prices import ElectricityPrices
+from epm.scraping_utils.fuel_prices import FuelPrices
+from epm.scraping_utils.gas_prices import GasPrices
+from epm.scraping_utils.http_client import HttpClient
+
+
+async def refresh_all(store: PriceStore = None, client: HttpClient = None) -> dict:
+    """
+    Refreshes fuel, PUN and TTF gas prices concurrently, sharing one
+    connection pool, so that the total wall time is close to the one of
+    the slowest source rather than to the sum of all of them.
+
+    Every source runs in a worker thread, as the scrapers are blocking;
+    a failing source does not stop the others.
+
+    Returns
+    --------
+    `results`: `dict`
+        for each source, the seconds it took or the exception it raised.
+    """
+    store = store if store is not None else PriceStore()
+    client = client if client is not None else HttpClient()
+    sources = {
+        "fuel": FuelPrices(store=store, client=client).update,
+        "pun": ElectricityPrices(store=store, client=client).ingest,
+        "gas": lambda: GasPrices.update(store, session=client.session),
+    }
+
+    def timed(update):
+        start = time.perf_counter()
+        update()
+        return time.perf_counter() - start
+
+    results = await asyncio.gather(
+        *(asyncio.to_thread(timed, update) for update in sources.values()),
+        return_exceptions=True,
+    )
+    return dict(zip(sources, results))
+
+
+def refresh(store: PriceStore = None, client: HttpClient = None) -> dict:
+    """
+    Synchronous entry point of `refresh_all`, also runnable as
+    `python -m epm.scraping_utils.refresh`.
+    """
+    return asyncio.run(refresh_all(store=store, client=client))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    for source, result in refresh().items():
+        print(f"{source}: {result}")
+    print(f"Refreshed in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,225 @@
+import datetime
+import functools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+import psutil
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    parent TEXT,
+    started_at TEXT NOT NULL,
+    wall_s REAL NOT NULL,
+    cpu_s REAL NOT NULL,
+    rss_mb REAL NOT NULL,
+    rss_delta_mb REAL NOT NULL,
+    peak_rss_mb REAL,
+    pid INTEGER NOT NULL,
+    run_id TEXT,
+    attrs TEXT
+);
+CREATE INDEX IF NOT EXISTS spans_started_at ON spans (started_at);
+"""
+
+# the handle of the current process, created again in forked children
+_PROCESS = None
+_local = threading.local()
+
+
+def _process() -> psutil.Process:
+    global _PROCESS
+    if _PROCESS is None or _PROCESS.pid != os.getpid():
+        _PROCESS = psutil.Process()
+    return _PROCESS
+
+
+def _peak_rss() -> int:
+    """
+    The highest resident memory of the process so far, in bytes.
+    """
+    if resource is None:
+        info = _process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class TraceStore:
+    """
+    Local store of the spans recorded by `span`, a SQLite file shared by
+    the Streamlit sessions, the batch jobs and the workers, and read by the
+    diagnostics page.
+
+    Only the `max_entries` most recent spans are kept. Every thread keeps
+    its own connection open, so that recording a span is a single insert.
+    """
+
+    def __init__(self, path: str = "data/traces.sqlite", max_entries: int = 100000) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            # stores created before the peak memory was recorded
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(spans)")]
+            if "peak_rss_mb" not in columns:
+                conn.execute("ALTER TABLE spans ADD COLUMN peak_rss_mb REAL")
+
+    def write(self, record: dict) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO spans (name, parent, started_at, wall_s, cpu_s, rss_mb, rss_delta_mb, peak_rss_mb, pid, run_id, attrs) "
+            "VALUES (:name, :parent, :started_at, :wall_s, :cpu_s, :rss_mb, :rss_delta_mb, :peak_rss_mb, :pid, :run_id, :attrs)",
+            {**record, "attrs": json.dumps(record["attrs"], default=str)}
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            conn.execute(
+                "DELETE FROM spans WHERE id <= (SELECT MAX(id) FROM spans) - ?", (self.max_entries,)
+            )
+
+    def read(self, since: datetime.datetime = None, names: list = None) -> pd.DataFrame:
+        """
+        Returns the spans started after `since`, of the given `names`,
+        oldest first.
+        """
+        query, args = "SELECT * FROM spans WHERE 1 = 1", []
+        if since is not None:
+            query += " AND started_at >= ?"
+            args.append(since.isoformat())
+        if names:
+            query += f" AND name IN ({','.join('?' * len(names))})"
+            args += list(names)
+        with closing(self._connect()) as conn:
+            spans = pd.read_sql_query(query + " ORDER BY id", conn, params=args)
+        spans["started_at"] = pd.to_datetime(spans["started_at"])
+        return spans
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        The connection of the current thread, opened on first use; a forked
+        child opens its own instead of sharing the one of its parent.
+        """
+        pid, conn = getattr(self._local, "conn", (None, None))
+        if pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # in WAL mode, a crash can only lose the last commits, never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+# shared by the spans of this process, created on first use;
+# tracing is turned off with EPM_TRACING=0
+TRACE_STORE = None
+ENABLED = os.environ.get("EPM_TRACING", "1") != "0"
+
+
+def trace_store() -> TraceStore:
+    global TRACE_STORE
+    if TRACE_STORE is None:
+        TRACE_STORE = TraceStore(os.environ.get("EPM_TRACE_STORE", "data/traces.sqlite"))
+    return TRACE_STORE
+
+
+class span:
+    """
+    Times a stage of the app, as a context manager or a decorator:
+
+        with span("prophet.fit", rows=len(df)):
+            model.fit(df)
+
+        @span("fuel.update")
+        def update(self): ...
+
+    Records its wall time, the CPU time of the process, the resident
+    memory after the stage and its growth during it, and the peak resident
+    memory of the process at the end of the stage, in the `TraceStore` and,
+    inside an MLflow run, as metrics of the run. A stage that allocates and
+    frees memory shows up in its peak: `peak_rss_mb` is above the peak of
+    the previous stages only if this one raised it. Spans opened inside
+    another one record its name as their `parent`.
+    """
+
+    def __init__(self, name: str, **attrs) -> None:
+        self.name = name
+        self.attrs = attrs
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(self.name, **self.attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self) -> "span":
+        if not ENABLED:
+            return self
+        stack = _local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.started_at = datetime.datetime.now()
+        self.rss = _process().memory_info().rss
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if not ENABLED:
+            return
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        rss = _process().memory_info().rss
+        peak_rss = _peak_rss()
+        _local.stack.pop()
+
+        record = {
+            "name": self.name,
+            "parent": self.parent,
+            "started_at": self.started_at.isoformat(),
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rss_mb": rss / 2**20,
+            "rss_delta_mb": (rss - self.rss) / 2**20,
+            "peak_rss_mb": peak_rss / 2**20,
+            "pid": os.getpid(),
+            "run_id": None,
+            "attrs": {**self.attrs, "error": exc_type.__name__} if exc_type else self.attrs,
+        }
+        try:
+            # only when the caller uses mlflow, which is not imported for a span
+            mlflow = sys.modules.get("mlflow")
+            run = mlflow.active_run() if mlflow is not None else None
+            if run is not None:
+                record["run_id"] = run.info.run_id
+                mlflow.log_metrics({
+                    f"{self.name}.wall_s": wall,
+                    f"{self.name}.cpu_s": cpu,
+                    f"{self.name}.rss_mb": record["rss_mb"],
+                    f"{self.name}.peak_rss_mb": record["peak_rss_mb"],
+                })
+            trace_store().write(record)
+        except Exception as e:
+            # tracing never breaks the traced code
+            print(f"Failed to record span {self.name}: {e}")
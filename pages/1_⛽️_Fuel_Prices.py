@@ -2,12 +2,25 @@ import datetime
 import pandas as pd 
 import plotly.express as px
 import streamlit as st
+import time
 
-from prophet.plot import plot_plotly, plot_components_plotly
-
-
-from epm.models.prophet.forecaster import Forecaster
-from epm.scraping_utils.fuel_prices import FuelPrices
+from epm.commodities import commodity_of
+from epm.downsampling import downsample
+from epm.jobs import job_key
+from epm.models.batch import snapshot_training_data
+from epm.models.worker import ensure_workers
+from epm.pages_common import (
+    get_figure_cache,
+    get_forecast_store,
+    get_job_queue,
+    get_price_cache,
+    history_figure,
+    load_forecaster,
+    prediction_figure,
+    select_window,
+    windowed_forecast_figure,
+)
+from epm.plots import MAX_POINTS, data_version
 
 st.set_page_config(
     page_title="Prezzi Carburanti",
@@ -23,11 +36,8 @@ st.markdown(
     """
 )
 
-fp = FuelPrices()
-
-@st.cache_data
 def get_fuel_prices() -> pd.DataFrame:
-    fuel_prices=fp.get_data()
+    fuel_prices = get_price_cache().get("fuel")
     return fuel_prices
 
 fuel_prices = get_fuel_prices()
@@ -72,27 +82,28 @@ def click_predict():
 
 st.session_state["model_trained"] = False
 
-@st.cache_resource()
-def model_training() -> Forecaster:
+def submit_training() -> int:
     """
-    Returns the fitted forecaster
+    Queues the training of the model for the worker processes, unless the same
+    model is already trained or being trained, returns the job id
     """
     horizon = st.session_state["horizon"]*7
     period = st.session_state["period"]*7
     initial = round(len(fuel_prices)*0.75) 
 
-    forecaster = Forecaster()
-
-    forecaster.train_model(
-        experiment_name=st.session_state["experiment_name"],
-        train_df=sel_fuel_price,
-        target_col=st.session_state["target_col"],
-        artifact_path=st.session_state["artifact_path"],
-        horizon=f"{horizon} days",
-        period=f"{period} days",
-        initial=f"{initial} days"
-    )
-    return forecaster
+    commodity = commodity_of("fuel", st.session_state["target_col"])
+    params = {
+        "commodity": commodity,
+        # the worker trains on exactly these prices
+        "data_version": snapshot_training_data(commodity, fuel_prices),
+        "horizon": f"{horizon} days",
+        "period": f"{period} days",
+        "initial": f"{initial} days"
+    }
+    # identical requests, from any session, share one training
+    key = job_key("prophet", params)
+    ensure_workers(get_job_queue())
+    return get_job_queue().submit("prophet", params, key=key)
 
 with st.expander(label='Fuel Prices Data'):
     st.dataframe(data=fuel_prices, use_container_width=True)
@@ -100,17 +111,27 @@ with st.expander(label='Fuel Prices Data'):
 if "predictions" not in st.session_state:
     with st.container():
         if not st.session_state["target_selected"]:
-            fig = px.line(
-                data_frame=fuel_prices,
-                y=[fuel_prices["BENZINA"], fuel_prices["DIESEL"], fuel_prices["GPL"]],
-                title="Andamento storico dei prezzi dei carburanti"
+            start, end = select_window(fuel_prices.index.min(), fuel_prices.index.max(), key="history_window")
+            fig = get_figure_cache().get(
+                ("history", data_version(fuel_prices), start, end, MAX_POINTS),
+                lambda: px.line(
+                    # every fuel downsampled on its own, in long format
+                    data_frame=pd.concat([
+                        downsample(fuel_prices[col], MAX_POINTS, start=start, end=end).to_frame(name="value").assign(variable=col)
+                        for col in ("BENZINA", "DIESEL", "GPL")
+                    ]),
+                    y="value",
+                    color="variable",
+                    title="Andamento storico dei prezzi dei carburanti"
+                )
             )
             st.plotly_chart(fig)
             st.write("Puoi selezionare i dati di un carburante per addestrare un modello e effettuare previsioni")
         else:
-            fig = px.line(
-                data_frame=fuel_prices,
-                y=st.session_state["target_col"],
+            fig = history_figure(
+                fuel_prices,
+                column=st.session_state["target_col"],
+                key="history_window",
                 title=f'Andamento storico dei prezzi {st.session_state["target_col"]} (€/lt)'
             )
             st.plotly_chart(fig)
@@ -118,22 +139,13 @@ else:
     with st.container():
         if not st.session_state["keep_in_sample_forecast"]:
             st.caption(f'Predizione andamento futuro dei prezzi {st.session_state["target_col"]}')
-            fig = plot_plotly(
-                m=st.session_state["forecaster"].model,
-                fcst=st.session_state.predictions.tail(st.session_state["n_steps"]),
-                xlabel="Data",
-                ylabel=f'{st.session_state["target_col"]}'
-            )
-            st.plotly_chart(fig, use_container_width=True)
         else:
-            st.caption("Storico + predizione dell'andamento del Prezzo Unico Nazionale")
-            fig = plot_plotly(
-                m=st.session_state["forecaster"].model,
-                fcst=st.session_state["predictions"],
-                xlabel="Data",
-                ylabel=f'{st.session_state["target_col"]}'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f'Storico + predizione dell\'andamento dei prezzi {st.session_state["target_col"]}')
+        predictions = st.session_state["predictions"]
+        if not st.session_state["keep_in_sample_forecast"]:
+            predictions = predictions.tail(st.session_state["n_steps"])
+        fig = prediction_figure(st.session_state["forecaster"], predictions, ylabel=f'{st.session_state["target_col"]}')
+        st.plotly_chart(fig, use_container_width=True)
         
 st.session_state["target_col"] = st.selectbox(
     label="Seleziona il carburante di cui vuoi prevedere l'andamento del prezzo",
@@ -142,11 +154,51 @@ st.session_state["target_col"] = st.selectbox(
     placeholder="Seleziona dati.."
 )
 
+if st.session_state.target_col:
+    commodity = commodity_of("fuel", st.session_state.target_col)
+    precomputed = get_forecast_store().read(commodity)
+
+    with st.sidebar:
+        st.session_state["mode"] = st.radio(
+            label="Come vuoi ottenere le previsioni?",
+            options=("Previsioni precalcolate", "Addestra un modello"),
+            index=0 if precomputed is not None else 1,
+            help="Le previsioni precalcolate vengono aggiornate periodicamente con i parametri predefiniti; addestrando un modello puoi scegliere orizzonte e frequenza."
+        )
+
+    if st.session_state["mode"] == "Previsioni precalcolate":
+        if precomputed is None:
+            st.info("Non ci sono ancora previsioni precalcolate: puoi addestrare un modello dal menu a sinistra!")
+            st.stop()
+        meta = get_forecast_store().read_meta(commodity)
+        st.caption(f'Storico + predizione dell\'andamento dei prezzi {st.session_state["target_col"]}, aggiornata al {meta["trained_at"][:10]}')
+        fig = windowed_forecast_figure(
+            fuel_prices[st.session_state["target_col"]],
+            precomputed,
+            ylabel=f'{st.session_state["target_col"]}',
+            key="precomputed_window"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        preds = precomputed[precomputed.index > meta["last_observation"]]
+        preds = preds.rename_axis("data").rename(
+            columns={
+                "yhat": "predizione",
+                "yhat_lower": "predizione_minima",
+                "yhat_upper": "predizione_massima"
+            }
+        )
+        st.download_button(
+            label="Clicca per scaricare il dato di forecast",
+            data=preds.to_csv(),
+            file_name=f'forecast_{st.session_state["target_col"]}.csv'
+        )
+        with st.expander(label="Espandi per vedere il dato di forecast"):
+            st.dataframe(data=preds)
+        st.stop()
+
 if st.session_state.target_col:
     set_experiment()
-    col = st.session_state["target_col"]
-    sel_fuel_price = fuel_prices[[col]]
-    sel_fuel_price.index.rename("index", inplace=True)
 
     with st.sidebar:
         st.session_state["horizon"] = st.slider(
@@ -170,10 +222,24 @@ if st.session_state.target_col:
         st.button(label="Addestra il modello!", on_click=click_train)
 
 if st.session_state["train"]:
-    with st.spinner("Addestramento modello in corso.."):
-        st.session_state["forecaster"] = model_training()
-    st.success('Fatto! Il modello è addestrato e pronto ad effettuare le sue predizioni!')
-    st.session_state["model_trained"] = True
+    # the job of the current commodity and parameters, queued only if new
+    job = get_job_queue().status(submit_training())
+    if job["status"] in ("queued", "running"):
+        # poll the job without blocking the other sessions
+        if job["status"] == "queued":
+            st.info(f'Addestramento in coda, richieste prima della tua: {get_job_queue().position(job["id"])}')
+        with st.spinner("Addestramento modello in corso.."):
+            time.sleep(2)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error("Non è stato possibile addestrare il modello, riprova!")
+        st.session_state.train = False
+    else:
+        st.session_state["forecaster"] = load_forecaster(
+            job["result"]["model_uri"], fuel_prices, st.session_state["target_col"]
+        )
+        st.success('Fatto! Il modello è addestrato e pronto ad effettuare le sue predizioni!')
+        st.session_state["model_trained"] = True
 else: 
     st.info(
         "Puoi addestrare un algoritmo predittivo su questi dati cliccando sul bottone a sinistra!"
@@ -1,14 +1,26 @@
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
+import time
 
-
-from prophet.plot import plot_plotly, plot_components_plotly
-
-
-from epm.models.prophet.forecaster import Forecaster
-from epm.scraping_utils.elec_prices import ElectricityPrices
+from epm.downsampling import downsample
+from epm.jobs import job_key
+from epm.models.batch import snapshot_training_data
+from epm.models.worker import ensure_workers
+from epm.pages_common import (
+    get_figure_cache,
+    get_forecast_store,
+    get_job_queue,
+    get_price_cache,
+    history_figure,
+    load_forecaster,
+    prediction_figure,
+    select_window,
+    windowed_forecast_figure,
+)
+from epm.plots import MAX_POINTS, range_figure
+from epm.price_pyramid import PricePyramid
+from epm.scraping_utils.pun_aggregation import GME_TZ
 
 st.set_page_config(
     page_title="Prezzo Unico Nazionale",
@@ -31,11 +43,8 @@ st.markdown(
         La fonte del dato è il [Gestore dei Mercati Elettrici](https://www.mercatoelettrico.org/it/)
     """
 )
-ep = ElectricityPrices()
-
-@st.cache_data
 def get_electricity_prices() -> pd.DataFrame:
-    pun_prices = ep.get_data()
+    pun_prices = get_price_cache().get("pun")
     return pun_prices
 
 pun_prices = get_electricity_prices()
@@ -44,6 +53,45 @@ experiment_name = "electricity_model" # set the model training experiment name f
 target_col = "PUN"
 artifact_path = "electricity_prices_model"
 
+with st.expander(label='Prezzo Unico Nazionale'):
+    st.dataframe(data=pun_prices, use_container_width=True)
+
+precomputed = get_forecast_store().read("pun")
+
+with st.sidebar:
+    st.session_state["mode"] = st.radio(
+        label="Come vuoi ottenere le previsioni?",
+        options=("Previsioni precalcolate", "Addestra un modello"),
+        index=0 if precomputed is not None else 1,
+        help="Le previsioni precalcolate vengono aggiornate periodicamente con i parametri predefiniti; addestrando un modello puoi scegliere orizzonte e frequenza."
+    )
+
+if st.session_state["mode"] == "Previsioni precalcolate":
+    if precomputed is None:
+        st.info("Non ci sono ancora previsioni precalcolate: puoi addestrare un modello dal menu a sinistra!")
+        st.stop()
+    meta = get_forecast_store().read_meta("pun")
+    st.caption(f'Storico + predizione dell\'andamento del Prezzo Unico Nazionale, aggiornata al {meta["trained_at"][:10]}')
+    fig = windowed_forecast_figure(pun_prices[target_col], precomputed, ylabel="PUN (€/kWh)", key="precomputed_window")
+    st.plotly_chart(fig, use_container_width=True)
+
+    preds = precomputed[precomputed.index > meta["last_observation"]]
+    preds = preds.rename_axis("data").rename(
+        columns={
+            "yhat": "predizione",
+            "yhat_lower": "predizione_minima",
+            "yhat_upper": "predizione_massima"
+        }
+    )
+    st.download_button(
+        label="Clicca per scaricare il dato di forecast",
+        data=preds.to_csv(),
+        file_name="forecast_PUN.csv"
+    )
+    with st.expander(label="Espandi per vedere il dato di forecast"):
+        st.dataframe(data=preds)
+    st.stop()
+
 if 'train' not in st.session_state:
     st.session_state.train = False
 
@@ -80,71 +128,102 @@ with st.sidebar:
 
     st.button(label="Addestra il modello!", on_click=click_train)
 
-@st.cache_resource()
-def model_training() -> Forecaster:
+def submit_training() -> int:
     """
-    Returns the fitted forecaster
+    Queues the training of the model for the worker processes, unless the same
+    model is already trained or being trained, returns the job id
     """
     horizon = st.session_state["horizon"]*7
     period = st.session_state["period"]*7
     initial = round(len(pun_prices)*0.75) 
 
-    forecaster = Forecaster()
-
-    forecaster.train_model(
-        experiment_name=experiment_name,
-        train_df=pun_prices,
-        target_col=target_col,
-        artifact_path=artifact_path,
-        horizon=f"{horizon} days",
-        period=f"{period} days",
-        initial=f"{initial} days"
-    )
-    return forecaster
-
+    params = {
+        "commodity": "pun",
+        # the worker trains on exactly these prices
+        "data_version": snapshot_training_data("pun", pun_prices),
+        "horizon": f"{horizon} days",
+        "period": f"{period} days",
+        "initial": f"{initial} days"
+    }
+    # identical requests, from any session, share one training
+    key = job_key("prophet", params)
+    ensure_workers(get_job_queue())
+    return get_job_queue().submit("prophet", params, key=key)
 
-with st.expander(label='Prezzo Unico Nazionale'):
-    st.dataframe(data=pun_prices, use_container_width=True)
 
 if "predictions" not in st.session_state:
     with st.container():
-        fig = px.line(
-            pun_prices, 
-            y='PUN', 
-            title="Andamento storico del Prezzo Unico Nazionale dell'Energia",
-            labels={
-                "PUN": "PUN (€/kWh)",
-                "index": "Data"
-            }
-        )
+        # the hourly prices and their aggregates, once some archive was ingested
+        pyramid = PricePyramid(get_price_cache().store, "pun", column="PUN", tz=GME_TZ)
+        resolution = "Settimanale"
+        if pyramid.exists():
+            resolution = st.selectbox(
+                label="Risoluzione del grafico",
+                options=("Oraria", "Giornaliera", "Settimanale", "Mensile"),
+                index=2,
+                help="Le risoluzioni diverse da quella settimanale coprono solo i prezzi orari scaricati dagli archivi GME; la banda indica il prezzo minimo e massimo di ogni periodo."
+            )
+        if resolution == "Settimanale":
+            fig = history_figure(
+                pun_prices,
+                column=target_col,
+                key="history_window",
+                title="Andamento storico del Prezzo Unico Nazionale dell'Energia",
+                labels={
+                    "PUN": "PUN (€/kWh)",
+                    "index": "Data"
+                }
+            )
+        else:
+            levels = {"Oraria": "raw", "Giornaliera": "daily", "Mensile": "monthly"}
+            start, end = select_window(*pyramid.bounds(), key="pyramid_window")
+            # the pyramid is only read when the figure of its version is not cached
+            fig = get_figure_cache().get(
+                ("pyramid", resolution, pyramid.version(), start, end, MAX_POINTS),
+                lambda: range_figure(
+                    # the envelope keeps the hourly spikes, that the line of the means would smooth
+                    downsample(
+                        pyramid.read(levels[resolution], start=start, end=end - pd.Timedelta(hours=1)),
+                        MAX_POINTS,
+                        column="PUN",
+                        method="minmax" if resolution == "Oraria" else "lttb"
+                    ),
+                    column="PUN",
+                    title="Andamento storico del Prezzo Unico Nazionale dell'Energia",
+                    ylabel="PUN (€/kWh)"
+                )
+            )
         st.plotly_chart(fig)
 
 else:
     with st.container():
         if not st.session_state["keep_in_sample_forecast"]:
             st.caption("Predizione andamento futuro del Prezzo Unico Nazionale")
-            fig = plot_plotly(
-                m=st.session_state["forecaster"].model,
-                fcst=st.session_state.predictions.tail(st.session_state["n_steps"]),
-                xlabel="Data",
-                ylabel="PUN (€/kWh)"
-            )
-            st.plotly_chart(fig, use_container_width=True)
         else:
             st.caption("Storico + predizione dell'andamento del Prezzo Unico Nazionale")
-            fig = plot_plotly(
-                m=st.session_state["forecaster"].model,
-                fcst=st.session_state["predictions"],
-                xlabel="Data",
-                ylabel="PUN (€/kWh)"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        predictions = st.session_state["predictions"]
+        if not st.session_state["keep_in_sample_forecast"]:
+            predictions = predictions.tail(st.session_state["n_steps"])
+        fig = prediction_figure(st.session_state["forecaster"], predictions, ylabel="PUN (€/kWh)")
+        st.plotly_chart(fig, use_container_width=True)
 
 if st.session_state["train"]:
-    with st.spinner("Addestramento modello in corso.."):
-        st.session_state["forecaster"] = model_training()
-    st.success('Fatto! Il modello è addestrato e pronto ad effettuare le sue predizioni!')
-    st.session_state["model_trained"] = True
+    # the job of the current commodity and parameters, queued only if new
+    job = get_job_queue().status(submit_training())
+    if job["status"] in ("queued", "running"):
+        # poll the job without blocking the other sessions
+        if job["status"] == "queued":
+            st.info(f'Addestramento in coda, richieste prima della tua: {get_job_queue().position(job["id"])}')
+        with st.spinner("Addestramento modello in corso.."):
+            time.sleep(2)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error("Non è stato possibile addestrare il modello, riprova!")
+        st.session_state.train = False
+    else:
+        st.session_state["forecaster"] = load_forecaster(job["result"]["model_uri"], pun_prices, target_col)
+        st.success('Fatto! Il modello è addestrato e pronto ad effettuare le sue predizioni!')
+        st.session_state["model_trained"] = True
 else: 
     st.info(
         "Puoi addestrare un algoritmo predittivo su questi dati cliccando sul bottone a sinistra!"
@@ -1,14 +1,20 @@
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-
-
-from prophet.plot import plot_plotly, plot_components_plotly
-
-
-from epm.models.prophet.forecaster import Forecaster
-from epm.scraping_utils.gas_prices import GasPrices
+import time
+
+from epm.jobs import job_key
+from epm.models.batch import snapshot_training_data
+from epm.models.worker import ensure_workers
+from epm.pages_common import (
+    get_forecast_store,
+    get_job_queue,
+    get_price_cache,
+    history_figure,
+    load_forecaster,
+    prediction_figure,
+    windowed_forecast_figure,
+)
 
 st.set_page_config(
     page_title="Prezzo del Gas Naturale",
@@ -26,9 +32,8 @@ st.markdown(
     """
 )
 
-@st.cache_data()
 def get_gas_prices() -> pd.DataFrame:
-    gp = GasPrices.get_data()
+    gp = get_price_cache().get("gas")
     return gp
 
 gas_prices = get_gas_prices()
@@ -37,6 +42,45 @@ experiment_name = "gas_model" # set the model training experiment name for mlflo
 target_col = "GAS NATURALE"
 artifact_path = "gas_prices_model"
 
+with st.expander(label="Dati Gas Naturale (TTF)"):
+    st.dataframe(data=gas_prices, use_container_width=True)
+
+precomputed = get_forecast_store().read("gas")
+
+with st.sidebar:
+    st.session_state["mode"] = st.radio(
+        label="Come vuoi ottenere le previsioni?",
+        options=("Previsioni precalcolate", "Addestra un modello"),
+        index=0 if precomputed is not None else 1,
+        help="Le previsioni precalcolate vengono aggiornate periodicamente con i parametri predefiniti; addestrando un modello puoi scegliere orizzonte e frequenza."
+    )
+
+if st.session_state["mode"] == "Previsioni precalcolate":
+    if precomputed is None:
+        st.info("Non ci sono ancora previsioni precalcolate: puoi addestrare un modello dal menu a sinistra!")
+        st.stop()
+    meta = get_forecast_store().read_meta("gas")
+    st.caption(f'Storico + predizione dell\'andamento del prezzo del Gas Naturale, aggiornata al {meta["trained_at"][:10]}')
+    fig = windowed_forecast_figure(gas_prices[target_col], precomputed, ylabel="Prezzi TTF (€/smc)", key="precomputed_window")
+    st.plotly_chart(fig, use_container_width=True)
+
+    preds = precomputed[precomputed.index > meta["last_observation"]]
+    preds = preds.rename_axis("data").rename(
+        columns={
+            "yhat": "predizione",
+            "yhat_lower": "predizione_minima",
+            "yhat_upper": "predizione_massima"
+        }
+    )
+    st.download_button(
+        label="Clicca per scaricare il dato di forecast",
+        data=preds.to_csv(),
+        file_name="forecast_TTF.csv"
+    )
+    with st.expander(label="Espandi per vedere il dato di forecast"):
+        st.dataframe(data=preds)
+    st.stop()
+
 if 'train' not in st.session_state:
     st.session_state.train = False
 
@@ -73,36 +117,35 @@ with st.sidebar:
 
     st.button(label="Addestra il modello!", on_click=click_train)
 
-@st.cache_resource()
-def model_training() -> Forecaster:
+def submit_training() -> int:
     """
-    Returns the fitted forecaster
+    Queues the training of the model for the worker processes, unless the same
+    model is already trained or being trained, returns the job id
     """
     horizon = st.session_state["horizon"]*7
     period = st.session_state["period"]*7
     initial = round(len(gas_prices)*0.75) 
 
-    forecaster = Forecaster()
+    params = {
+        "commodity": "gas",
+        # the worker trains on exactly these prices
+        "data_version": snapshot_training_data("gas", gas_prices),
+        "horizon": f"{horizon} days",
+        "period": f"{period} days",
+        "initial": f"{initial} days"
+    }
+    # identical requests, from any session, share one training
+    key = job_key("prophet", params)
+    ensure_workers(get_job_queue())
+    return get_job_queue().submit("prophet", params, key=key)
 
-    forecaster.train_model(
-        experiment_name=experiment_name,
-        train_df=gas_prices,
-        target_col=target_col,
-        artifact_path=artifact_path,
-        horizon=f"{horizon} days",
-        period=f"{period} days",
-        initial=f"{initial} days"
-    )
-    return forecaster
-
-with st.expander(label="Dati Gas Naturale (TTF)"):
-    st.dataframe(data=gas_prices, use_container_width=True)
 
 if "predictions" not in st.session_state:
     with st.container():
-        fig = px.line(
-            gas_prices, 
-            y='GAS NATURALE', 
+        fig = history_figure(
+            gas_prices,
+            column=target_col,
+            key="history_window",
             title='Andamento storico dei prezzi del Gas Naturale',
             labels={
                 "GAS NATURALE": "Prezzi TTF (€/smc)",
@@ -115,28 +158,31 @@ else:
     with st.container():
         if not st.session_state["keep_in_sample_forecast"]:
             st.caption("Predizione andamento futuro del prezzo del Gas Naturale")
-            fig = plot_plotly(
-                m=st.session_state["forecaster"].model,
-                fcst=st.session_state.predictions.tail(st.session_state["n_steps"]),
-                xlabel="Data",
-                ylabel="Prezzi TTF (€/smc)"
-            )
-            st.plotly_chart(fig, use_container_width=True)
         else:
             st.caption("Storico + predizione dell'andamento del prezzo del Gas Naturale")
-            fig = plot_plotly(
-                m=st.session_state["forecaster"].model,
-                fcst=st.session_state["predictions"],
-                xlabel="Data",
-                ylabel="Prezzi TTF (€/smc)"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        predictions = st.session_state["predictions"]
+        if not st.session_state["keep_in_sample_forecast"]:
+            predictions = predictions.tail(st.session_state["n_steps"])
+        fig = prediction_figure(st.session_state["forecaster"], predictions, ylabel="Prezzi TTF (€/smc)")
+        st.plotly_chart(fig, use_container_width=True)
 
 if st.session_state["train"]:
-    with st.spinner("Addestramento modello in corso.."):
-        st.session_state["forecaster"] = model_training()
-    st.success('Fatto! Il modello è addestrato e pronto ad effettuare le sue predizioni!')
-    st.session_state["model_trained"] = True
+    # the job of the current commodity and parameters, queued only if new
+    job = get_job_queue().status(submit_training())
+    if job["status"] in ("queued", "running"):
+        # poll the job without blocking the other sessions
+        if job["status"] == "queued":
+            st.info(f'Addestramento in coda, richieste prima della tua: {get_job_queue().position(job["id"])}')
+        with st.spinner("Addestramento modello in corso.."):
+            time.sleep(2)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error("Non è stato possibile addestrare il modello, riprova!")
+        st.session_state.train = False
+    else:
+        st.session_state["forecaster"] = load_forecaster(job["result"]["model_uri"], gas_prices, target_col)
+        st.success('Fatto! Il modello è addestrato e pronto ad effettuare le sue predizioni!')
+        st.session_state["model_trained"] = True
 else: 
     st.info(
         "Puoi addestrare un algoritmo predittivo su questi dati cliccando sul bottone a sinistra!"
@@ -0,0 +1,85 @@
+import datetime
+import plotly.express as px
+import streamlit as st
+
+from epm.tracing import trace_store
+
+st.set_page_config(
+    page_title="Diagnostica",
+    page_icon="📊",
+)
+
+st.markdown(
+    """
+        Tempi di esecuzione delle fasi dell'applicazione: download e lettura
+        dei dati, preprocessing, addestramento, cross-validazione, predizione
+        e salvataggio dei modelli su MLflow.
+
+        Ogni fase registra il tempo reale, il tempo di CPU, la memoria
+        residente del processo (RSS) alla sua conclusione e il picco di
+        memoria residente raggiunto dal processo fino a quel momento.
+    """
+)
+
+with st.sidebar:
+    days = st.slider(
+        label="Giorni da analizzare",
+        min_value=1,
+        max_value=90,
+        value=7,
+        step=1
+    )
+
+spans = trace_store().read(since=datetime.datetime.now() - datetime.timedelta(days=days))
+
+if len(spans) == 0:
+    st.info("Nessuna misura registrata nel periodo selezionato. Usa le altre pagine dell'app per raccoglierne.")
+    st.stop()
+
+summary = spans.groupby("name").agg(
+    esecuzioni=("wall_s", "size"),
+    p50_s=("wall_s", "median"),
+    p95_s=("wall_s", lambda s: s.quantile(0.95)),
+    max_s=("wall_s", "max"),
+    cpu_medio_s=("cpu_s", "mean"),
+    rss_max_mb=("rss_mb", "max"),
+    picco_rss_mb=("peak_rss_mb", "max"),
+    ultima=("started_at", "max"),
+).sort_values("p95_s", ascending=False)
+
+st.caption("Riepilogo per fase, ordinato dalle fasi più lente")
+st.dataframe(data=summary, use_container_width=True)
+
+stages = st.multiselect(
+    label="Fasi da confrontare",
+    options=list(summary.index),
+    default=list(summary.index[:4])
+)
+if stages:
+    selected = spans[spans["name"].isin(stages)]
+    fig = px.histogram(
+        data_frame=selected,
+        x="wall_s",
+        color="name",
+        facet_row="name",
+        nbins=50,
+        labels={"wall_s": "tempo reale (s)", "name": "fase"},
+        title="Distribuzione delle latenze per fase"
+    )
+    fig.update_yaxes(matches=None)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    fig.update_layout(showlegend=False, height=200 + 180 * len(stages))
+    st.plotly_chart(fig, use_container_width=True)
+
+    fig = px.scatter(
+        data_frame=selected,
+        x="started_at",
+        y="wall_s",
+        color="name",
+        labels={"started_at": "inizio", "wall_s": "tempo reale (s)", "name": "fase"},
+        title="Latenze nel tempo"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+with st.expander(label="Espandi per vedere tutte le misure"):
+    st.dataframe(data=spans.sort_values("id", ascending=False), use_container_width=True)